@@ -0,0 +1,249 @@
+# agentProcess.py
+# ---------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Agents hosted in their own long-lived worker process.
+
+IsolatedAgent stands in for an agent inside a Game.  The real agent is built
+in a worker process that lives across moves and games.  The worker keeps a
+mirror of the game state: it gets the whole state once per game, in
+registerInitialState, and after that only the state deltas between what
+the agent saw last and what it sees now.
+
+The parent enforces the limits.  A move that runs over its budget gets the
+worker killed and raises TimeoutFunctionException.  A worker that dies,
+for example from its memory limit, raises an Exception.  With
+catchExceptions on, Game.run treats both like any other timeout or crash.
+The next registerInitialState starts a fresh worker.
+
+  python pacman.py -p AlphaBetaAgent -a depth=3 -q -c --isolate --agentMemory 512
+"""
+
+from game import Agent, Configuration
+from util import TimeoutFunctionException
+import multiprocessing
+import random
+import signal
+import traceback
+import util
+
+##########
+# Deltas #
+##########
+
+def agentKey(agentState):
+    configuration = agentState.configuration
+    return (configuration.pos, configuration.direction, agentState.scaredTimer,
+            agentState.numCarrying, agentState.numReturned)
+
+def stateDelta(old, new):
+    """
+    Returns what changed between two GameStates of the same game: the agents
+    that moved or changed, the food cells that flipped, the capsules if any
+    were eaten, and the score and bookkeeping flags.
+    """
+    old, new = old.data, new.data
+    agents = []
+    for index, agentState in enumerate(new.agentStates):
+        key = agentKey(agentState)
+        if key != agentKey(old.agentStates[index]): agents.append((index,) + key)
+    food = []
+    if old.food.data is not new.food.data:
+        for x, column in enumerate(new.food.data):
+            oldColumn = old.food.data[x]
+            if column != oldColumn:
+                food += [(x, y) for y in range(len(column)) if column[y] != oldColumn[y]]
+    capsules = None
+    if old.capsules != new.capsules: capsules = new.capsules
+    eaten = None
+    if old._eaten != new._eaten: eaten = new._eaten
+    return (agents, food, capsules, new.score, eaten, new._agentMoved,
+            new._foodEaten, new._foodAdded, new._capsuleEaten, new._win, new._lose)
+
+def applyDelta(state, delta):
+    """
+    Returns the state that delta leads to from state.
+    """
+    agents, food, capsules, score, eaten, agentMoved, foodEaten, foodAdded, capsuleEaten, win, lose = delta
+    state = state.deepCopy(False)
+    data = state.data
+    for index, pos, direction, scaredTimer, numCarrying, numReturned in agents:
+        agentState = data.agentStates[index]
+        agentState.configuration = Configuration(pos, direction)
+        agentState.scaredTimer = scaredTimer
+        agentState.numCarrying = numCarrying
+        agentState.numReturned = numReturned
+    for x, y in food:
+        data.food[x][y] = not data.food[x][y]
+    if capsules != None: data.capsules = capsules[:]
+    if eaten != None: data._eaten = eaten[:]
+    data.score = score
+    data._agentMoved = agentMoved
+    data._foodEaten = foodEaten
+    data._foodAdded = foodAdded
+    data._capsuleEaten = capsuleEaten
+    data._win = win
+    data._lose = lose
+    return state
+
+##########
+# Worker #
+##########
+
+def serveAgent(conn, agentType, agentArgs, memoryLimit=None):
+    """
+    The worker loop: builds the agent, then answers requests from the other
+    end of conn until it is closed.  Replies are ('ok', value) or
+    ('error', traceback).
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memoryLimit:
+        import resource
+        limit = int(memoryLimit * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    agent = None
+    state = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        kind = message[0]
+        if kind == 'close': break
+        try:
+            if agent == None: agent = agentType(**agentArgs)
+            reply = None
+            if kind == 'register':
+                state, seed = message[1], message[2]
+                random.seed(seed)
+                if 'registerInitialState' in dir(agent):
+                    agent.registerInitialState(state.deepCopy())
+            elif kind == 'action':
+                state = applyDelta(state, message[1])
+                reply = agent.getAction(state.deepCopy(False))
+            elif kind == 'final':
+                state = applyDelta(state, message[1])
+                if 'final' in dir(agent): agent.final(state)
+            else:
+                raise Exception('Unknown request ' + str(kind))
+            conn.send(('ok', reply))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+
+#########
+# Proxy #
+#########
+
+class IsolatedAgent(Agent):
+    """
+    An agent of type agentType, built from agentArgs in a worker process.
+
+    moveTimeout bounds every request in seconds; when the call runs under a
+    util deadline (Game.run with catchExceptions), the tighter one applies.
+    memoryLimit caps the worker's address space in megabytes.  The worker's
+    random module is seeded from the parent's random state at the start of
+    every game, so seeded runs stay reproducible.
+    """
+
+    def __init__(self, agentType, agentArgs=None, index=0, moveTimeout=None, memoryLimit=None):
+        Agent.__init__(self, index)
+        self.agentType = agentType
+        self.agentArgs = agentArgs or {}
+        self.moveTimeout = moveTimeout
+        self.memoryLimit = memoryLimit
+        self.process = None
+        self.conn = None
+        self.lastState = None
+
+    def start(self):
+        parentConn, childConn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=serveAgent,
+            args=(childConn, self.agentType, self.agentArgs, self.memoryLimit))
+        self.process.daemon = True
+        self.process.start()
+        childConn.close()
+        self.conn = parentConn
+
+    def kill(self):
+        if self.process == None: return
+        self.process.terminate()
+        self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+        self.lastState = None
+
+    def close(self):
+        """
+        Asks the worker to exit.
+        """
+        if self.process == None: return
+        try:
+            self.conn.send(('close',))
+            self.process.join(1)
+        except IOError:
+            pass
+        self.kill()
+
+    def isAlive(self):
+        return self.process != None and self.process.is_alive()
+
+    def getTimeout(self):
+        limits = [limit for limit in [self.moveTimeout, util.timeRemaining()] if limit != None]
+        if len(limits) == 0: return None
+        return max(0, min(limits))
+
+    def call(self, message):
+        if not self.isAlive():
+            self.kill()
+            raise Exception('The %s worker is not running' % self.agentType.__name__)
+        try:
+            self.conn.send(message)
+            if not self.conn.poll(self.getTimeout()):
+                self.kill()
+                raise TimeoutFunctionException()
+            status, value = self.conn.recv()
+        except (EOFError, IOError):
+            exitcode = self.process.exitcode
+            self.kill()
+            raise Exception('The %s worker died (exit code %s)' % (self.agentType.__name__, exitcode))
+        except:
+            # Interrupted mid-request (by a util deadline, say): the reply
+            # would arrive out of order, so the worker has to go.
+            self.kill()
+            raise
+        if status == 'error':
+            raise Exception('The %s worker raised:\n%s' % (self.agentType.__name__, value))
+        return value
+
+    def registerInitialState(self, state):
+        if not self.isAlive():
+            self.kill()
+            self.start()
+        self.lastState = state
+        self.call(('register', state, hash(random.getstate())))
+
+    def getAction(self, state):
+        if self.lastState == None:
+            raise Exception('The %s worker has no game in progress' % self.agentType.__name__)
+        delta = stateDelta(self.lastState, state)
+        self.lastState = state
+        return self.call(('action', delta))
+
+    def final(self, state):
+        if self.lastState == None or not self.isAlive(): return
+        delta = stateDelta(self.lastState, state)
+        self.lastState = None
+        self.call(('final', delta))
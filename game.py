@@ -23,6 +23,12 @@
 from util import *
 import time, os
 import traceback
+import binascii
+import copy
+import itertools
+import random
+import string
+import struct
 import sys
 
 #######################
@@ -159,6 +165,22 @@ class AgentState:
     def getDirection(self):
         return self.configuration.getDirection()
 
+# Translates a string of cell bytes (0 or 1) to one of '0's and '1's
+CELL_BITS = string.maketrans('\x00\x01', '01')
+
+def bitsToBytes(bits):
+    """
+    Packs a string of '0's and '1's into bytes, first bit highest, padding
+    the last byte with zeros.
+    """
+    if not bits: return ''
+    size = (len(bits) + 7) / 8
+    return binascii.unhexlify('%0*x' % (size * 2, int(bits.ljust(size * 8, '0'), 2)))
+
+def bytesToBits(data):
+    if not data: return ''
+    return bin(int(binascii.hexlify(data), 16))[2:].zfill(len(data) * 8)
+
 class Grid:
     """
     A 2-dimensional array of objects backed by a list of lists.  Data is accessed
@@ -232,18 +254,35 @@ class Grid:
 
         (width, height, bitPackedInts...)
         """
-        bits = [self.width, self.height]
-        currentInt = 0
-        for i in range(self.height * self.width):
-            bit = self.CELLS_PER_INT - (i % self.CELLS_PER_INT) - 1
-            x, y = self._cellIndexToPosition(i)
-            if self[x][y]:
-                currentInt += 2 ** bit
-            if (i + 1) % self.CELLS_PER_INT == 0:
-                bits.append(currentInt)
-                currentInt = 0
-        bits.append(currentInt)
-        return tuple(bits)
+        bits = self._cellBits()
+        size = self.CELLS_PER_INT
+        # A final, partly filled int is always appended, even when empty
+        ints = [int(bits[i:i + size].ljust(size, '0'), 2) for i in range(0, len(bits) + 1, size)]
+        return tuple([self.width, self.height] + ints)
+
+    def packBytes(self):
+        """
+        Returns the cells as a bitmask string, column by column.
+        """
+        return bitsToBytes(self._cellBits())
+
+    def unpackBytes(self, data):
+        """
+        Fills in data from the string packBytes returned.
+        """
+        self._setCellBits(bytesToBits(data)[:self.width * self.height])
+
+    def _cellBits(self):
+        """
+        The cells as a string of '0's and '1's, in cell index order.
+        """
+        return str(bytearray(itertools.chain.from_iterable(self.data))).translate(CELL_BITS)
+
+    def _setCellBits(self, bits):
+        height = self.height
+        for x in range(min(self.width, (len(bits) + height - 1) / height)):
+            column = bits[x * height:(x + 1) * height]
+            self.data[x][:len(column)] = [bit == '1' for bit in column]
 
     def _cellIndexToPosition(self, index):
         x = index / self.height
@@ -254,25 +293,15 @@ class Grid:
         """
         Fills in data from a bit-level representation
         """
-        cell = 0
-        for packed in bits:
-            for bit in self._unpackInt(packed, self.CELLS_PER_INT):
-                if cell == self.width * self.height: break
-                x, y = self._cellIndexToPosition(cell)
-                self[x][y] = bit
-                cell += 1
+        cells = ''.join([self._unpackString(packed, self.CELLS_PER_INT) for packed in bits])
+        self._setCellBits(cells[:self.width * self.height])
 
-    def _unpackInt(self, packed, size):
-        bools = []
+    def _unpackString(self, packed, size):
         if packed < 0: raise ValueError, "must be a positive integer"
-        for i in range(size):
-            n = 2 ** (self.CELLS_PER_INT - i - 1)
-            if packed >= n:
-                bools.append(True)
-                packed -= n
-            else:
-                bools.append(False)
-        return bools
+        return bin(packed)[2:].zfill(size)[-size:]
+
+    def _unpackInt(self, packed, size):
+        return [bit == '1' for bit in self._unpackString(packed, size)]
 
 def reconstituteGrid(bitRep):
     if type(bitRep) is not type((1,2)):
@@ -368,6 +397,20 @@ class Actions:
         return (x + dx, y + dy)
     getSuccessor = staticmethod(getSuccessor)
 
+# The fixed part of a state key: score, win and lose flags, number of agents
+STATE_KEY = struct.Struct('<dBB')
+# Each agent's part: x and y in half cells, heading and scared timer
+AGENT_KEY = struct.Struct('<HHBH')
+HEADINGS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+HEADING_CODES = dict([(heading, code) for code, heading in enumerate(HEADINGS)])
+
+def halfCells(n):
+    """
+    The coordinate n half cells from the origin, as an int when it can be.
+    """
+    if n % 2 == 0: return n / 2
+    return n / 2.0
+
 class GameStateData:
     """
 
@@ -392,10 +435,10 @@ class GameStateData:
         self._win = False
         self.scoreChange = 0
 
-    def deepCopy( self ):
+    def deepCopy( self, copyLayout=True ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        if copyLayout: state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
@@ -414,23 +457,67 @@ class GameStateData:
         """
         if other == None: return False
         # TODO Check for type of other
+        # Compares what encode keeps, without packing it
         if not self.agentStates == other.agentStates: return False
         if not self.food == other.food: return False
         if not self.capsules == other.capsules: return False
         if not self.score == other.score: return False
-        return True
+        return self._win == other._win and self._lose == other._lose
 
     def __hash__( self ):
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return hash( self.encode() )
+
+    def encode( self ):
+        """
+        Returns the state as a string: the score, the win and lose flags,
+        every agent's position, heading and scared timer, the capsules left
+        as a mask over the layout's capsules, and the food bitmask.  Two
+        states of a layout are equal exactly when their keys are.
+        """
+        return STATE_KEY.pack(self.score, self._win | self._lose << 1, len(self.agentStates)) + self.boardKey()
+
+    def boardKey( self ):
+        """
+        Returns the part of encode's key after the score and flags: where
+        the agents are, the capsules and the food.  A game going round in
+        circles comes back to the same board key with an ever lower score.
+        """
+        parts = []
+        for agentState in self.agentStates:
+            x, y = agentState.configuration.pos
+            heading = HEADING_CODES[agentState.configuration.direction]
+            parts.append(AGENT_KEY.pack(int(x * 2), int(y * 2), heading, agentState.scaredTimer))
+        capsules = self.capsules
+        parts.append(bitsToBytes(''.join(['01'[capsule in capsules] for capsule in self.layout.capsules])))
+        parts.append(self.food.packBytes())
+        return ''.join(parts)
+
+    def decode( self, layout, key ):
+        """
+        Sets this state to the one encode returned key for, on layout.
+        Bookkeeping for the display (what was just eaten or moved) is not
+        part of a key and starts out cleared.
+        """
+        score, flags, numAgents = STATE_KEY.unpack_from(key)
+        self.initialize(layout, numAgents - 1)
+        if score == int(score): score = int(score)
+        self.score = score
+        self._win = bool(flags & 1)
+        self._lose = bool(flags & 2)
+        offset = STATE_KEY.size
+        for agentState in self.agentStates:
+            x, y, heading, scaredTimer = AGENT_KEY.unpack_from(key, offset)
+            offset += AGENT_KEY.size
+            pos = (halfCells(x), halfCells(y))
+            agentState.configuration = Configuration(pos, HEADINGS[heading])
+            agentState.scaredTimer = scaredTimer
+        size = (len(layout.capsules) + 7) / 8
+        bits = bytesToBits(key[offset:offset + size])
+        self.capsules = [capsule for capsule, bit in zip(layout.capsules, bits) if bit == '1']
+        self.food.unpackBytes(key[offset + size:])
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -510,6 +597,8 @@ try:
 except:
     _BOINC_ENABLED = False
 
+AGENT_OUTPUT_SIZE = 64 * 1024
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
@@ -525,11 +614,33 @@ class Game:
         self.muteAgents = muteAgents
         self.catchExceptions = catchExceptions
         self.moveHistory = []
+        self.recorder = None
+        # A moveMetrics.MoveMetrics timing every move, if any
+        self.metrics = None
+        # run returns, without finishing the game, once this many moves are made
+        self.pauseAt = None
+        self.paused = False
+        # Why the rules ended the game before a win or loss, if they did
+        self.adjudicated = None
+        # The rules' own per-game counts, such as pacman.MoveLimit's
+        self.moveLimitCounts = None
+        # With a game seed here, each agent draws from its own random stream
+        self.randomStreams = None
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
-        import cStringIO
-        self.agentOutput = [cStringIO.StringIO() for agent in agents]
+        # Muted agents' output, of which the last AGENT_OUTPUT_SIZE characters are kept
+        self.agentOutput = [RingBuffer(AGENT_OUTPUT_SIZE) for agent in agents]
+
+    def seedAgent( self, agentIndex ):
+        """
+        Seeds the random module for agentIndex's next move (move -1 being its
+        registerInitialState) from the game seed in randomStreams.  An agent's
+        random numbers then depend only on the game seed, the agent and the
+        move, not on what the other agents drew before it, so ghosts given the
+        same seed roll the same dice whichever Pacman they play against.
+        """
+        random.seed((self.randomStreams, agentIndex, len(self.moveHistory)))
 
     def getProgress(self):
         if self.gameOver:
@@ -564,10 +675,86 @@ class Game:
         sys.stderr = OLD_STDERR
 
 
+    def nextAgentIndex( self ):
+        """
+        The agent whose move is next.
+        """
+        if len(self.moveHistory) == 0: return self.startingIndex
+        return (self.moveHistory[-1][0] + 1) % len(self.agents)
+
+    def checkpoint( self ):
+        """
+        Returns a GameCheckpoint of the game as it stands between two moves,
+        say after run stopped at pauseAt or from a recorder.
+        """
+        return GameCheckpoint(self)
+
+    def canRunFast( self ):
+        """
+        Headless games whose agents are neither muted nor guarded can skip
+        the per-move bookkeeping of run.
+        """
+        if self.catchExceptions or self.muteAgents: return False
+        if None in self.agents: return False
+        return 'checkNullDisplay' in dir(self.display) and self.display.checkNullDisplay()
+
+    def runFast( self ):
+        """
+        Plays the same game as run, a whole round per iteration.  Agent
+        hooks are looked up once, display updates are skipped and
+        observations share the layout instead of copying it.
+        """
+        self.display.initialize(self.state.data)
+        self.numMoves = 0
+        streams = self.randomStreams
+        for index, agent in enumerate(self.agents):
+            if "registerInitialState" in dir(agent):
+                if streams != None: random.seed((streams, index, -1))
+                agent.registerInitialState(self.state.deepCopy())
+
+        observers = []
+        for agent in self.agents:
+            if 'observationFunction' in dir(agent): observers.append(agent.observationFunction)
+            else: observers.append(None)
+        turns = [(index, observers[index], self.agents[index].getAction) for index in range(len(self.agents))]
+        moveHistory = self.moveHistory
+        recorder = self.recorder
+        rules = self.rules
+
+        turnOrder = turns[self.startingIndex:]
+        pauseAt = self.pauseAt
+        metrics = self.metrics
+        while not self.gameOver:
+            for agentIndex, observer, getAction in turnOrder:
+                if len(moveHistory) == pauseAt:
+                    self.paused = True
+                    return
+                if streams != None: random.seed((streams, agentIndex, len(moveHistory)))
+                if metrics != None: wallStart, cpuStart = time.time(), time.clock()
+                observation = self.state.deepCopy(False)
+                if observer != None: observation = observer(observation)
+                action = getAction(observation)
+                if metrics != None: metrics.recordMove(agentIndex, time.time() - wallStart, time.clock() - cpuStart)
+                moveHistory.append( (agentIndex, action) )
+                nextState = self.state.generateSuccessor( agentIndex, action )
+                if recorder != None: recorder.recordMove(self.state, agentIndex, action)
+                self.state = nextState
+                rules.process(self.state, self)
+                if self.gameOver: break
+            turnOrder = turns
+            if _BOINC_ENABLED:
+                boinc.set_fraction_done(self.getProgress())
+
+        for agent in self.agents:
+            if "final" in dir( agent ):
+                agent.final( self.state )
+        self.display.finish()
+
     def run( self ):
         """
         Main control loop for game play.
         """
+        if self.canRunFast(): return self.runFast()
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -584,10 +771,11 @@ class Game:
                 self._agentCrash(i, quiet=True)
                 return
             if ("registerInitialState" in dir(agent)):
+                if self.randomStreams != None: random.seed((self.randomStreams, i, -1))
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = TimeoutFunction(agent.registerInitialState, self.rules.getMaxStartupTime(i))
                         try:
                             start_time = time.time()
                             timed_func(self.state.deepCopy())
@@ -612,6 +800,11 @@ class Game:
         numAgents = len( self.agents )
 
         while not self.gameOver:
+            if len(self.moveHistory) == self.pauseAt:
+                self.paused = True
+                return
+            if self.randomStreams != None: self.seedAgent(agentIndex)
+            if self.metrics != None: wallStart, cpuStart = time.time(), time.clock()
             # Fetch the next agent
             agent = self.agents[agentIndex]
             move_time = 0
@@ -621,7 +814,7 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
+                        timed_func = TimeoutFunction(agent.observationFunction, self.rules.getMoveTimeout(agentIndex))
                         try:
                             start_time = time.time()
                             observation = timed_func(self.state.deepCopy())
@@ -644,7 +837,7 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = TimeoutFunction(agent.getAction, self.rules.getMoveTimeout(agentIndex) - move_time)
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -685,19 +878,24 @@ class Game:
             else:
                 action = agent.getAction(observation)
             self.unmute()
+            if self.metrics != None:
+                self.metrics.recordMove(agentIndex, time.time() - wallStart, time.clock() - cpuStart)
 
             # Execute the action
+            # Only moves that were legal reach the recorder
             self.moveHistory.append( (agentIndex, action) )
             if self.catchExceptions:
                 try:
-                    self.state = self.state.generateSuccessor( agentIndex, action )
+                    nextState = self.state.generateSuccessor( agentIndex, action )
                 except Exception,data:
                     self.mute(agentIndex)
                     self._agentCrash(agentIndex)
                     self.unmute()
                     return
             else:
-                self.state = self.state.generateSuccessor( agentIndex, action )
+                nextState = self.state.generateSuccessor( agentIndex, action )
+            if self.recorder != None: self.recorder.recordMove(self.state, agentIndex, action)
+            self.state = nextState
 
             # Change the display
             self.display.update( self.state.data )
@@ -727,3 +925,54 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+class GameCheckpoint:
+    """
+    A Game frozen between two moves: its state and move history, the time
+    its agents have used and the random module's state or streams.  Each fork plays on
+    from here as a new, independent Game.
+    """
+
+    def __init__( self, game ):
+        self.state = game.state.deepCopy(False)
+        self.moveHistory = game.moveHistory[:]
+        self.totalAgentTimes = game.totalAgentTimes[:]
+        self.totalAgentTimeWarnings = game.totalAgentTimeWarnings[:]
+        self.moveLimitCounts = copy.deepcopy(game.moveLimitCounts)
+        self.nextAgent = game.nextAgentIndex()
+        self.randomState = random.getstate()
+        self.randomStreams = game.randomStreams
+        self.agents = game.agents
+        self.rules = game.rules
+        self.muteAgents = game.muteAgents
+        self.catchExceptions = game.catchExceptions
+
+    def getNumMoves( self ):
+        return len(self.moveHistory)
+
+    def fork( self, agents=None, display=None, seed=None ):
+        """
+        Returns a Game that plays on from the checkpoint when run.  agents
+        replaces the game's agents, which are otherwise deep copied so forks
+        do not share them; agents that hold threads, processes or sockets
+        have to be passed in.  The random module is reset to its state at
+        the checkpoint, or seeded with seed, so forks given the same seed
+        see the same random numbers; a seed also becomes the fork's
+        randomStreams.  The display defaults to none.
+        """
+        if agents == None: agents = copy.deepcopy(self.agents)
+        if display == None:
+            import textDisplay
+            display = textDisplay.NullGraphics()
+        game = Game(agents, display, self.rules, self.nextAgent, self.muteAgents, self.catchExceptions)
+        game.state = self.state.deepCopy(False)
+        game.moveHistory = self.moveHistory[:]
+        game.totalAgentTimes = self.totalAgentTimes[:]
+        game.totalAgentTimeWarnings = self.totalAgentTimeWarnings[:]
+        game.moveLimitCounts = copy.deepcopy(self.moveLimitCounts)
+        game.randomStreams = self.randomStreams
+        if seed == None: random.setstate(self.randomState)
+        else:
+            random.seed(seed)
+            game.randomStreams = seed
+        return game
@@ -0,0 +1,430 @@
+# gameLog.py
+# ----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+An append-only log of recorded games with random access.
+
+The log is written while games are played.  Inside, it is a list of records:
+
+  L  a layout, stored once per log and named by the SHA-1 of its text
+  G  the start of a game on a layout
+  M  a block of moves, one byte each (agent index << 3 | action)
+  S  a snapshot of the state before some move of the game
+  E  the end of a game, with its score and result
+
+Records are deflated in segments of a few games, so games compress against
+each other, and every block of moves is flushed to disk as it is written.
+On disk a segment is a run of frames: a kind byte ('N' starts a segment, 'C'
+continues it), a 4 byte length and the deflated bytes.  A segment can be
+inflated on its own, and a torn frame at the end of a log is dropped.
+
+The index (log file + '.idx', rebuilt from the log when stale) gives every
+game's records and snapshots by segment, so GameLogReader.stateAt seeks to
+any move of any game from the nearest snapshot instead of replaying from
+the first move.
+
+  python pacman.py -q -n 100 -r --recordFile games.pmlog
+  python pacman.py --replay games.pmlog --replayGame 7 --replayFrom 300
+"""
+
+from game import Directions
+import bisect
+import hashlib
+import marshal
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = 'PMGL'
+VERSION = 1
+FRAME = struct.Struct('<cI')
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP, None, None, None]
+MARSHAL_VERSION = 2
+
+#############
+# Encodings #
+#############
+
+def encodeVarint(value):
+    out = []
+    while value >= 0x80:
+        out.append(chr((value & 0x7f) | 0x80))
+        value >>= 7
+    out.append(chr(value))
+    return ''.join(out)
+
+def decodeVarint(data, offset):
+    value = shift = 0
+    while True:
+        byte = ord(data[offset])
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80: return value, offset
+        shift += 7
+
+def encodeRecord(kind, payload):
+    return kind + encodeVarint(len(payload)) + payload
+
+def decodeRecord(data, offset):
+    """
+    Returns the (kind, payload, next offset) of the record at offset.
+    """
+    kind = data[offset]
+    size, offset = decodeVarint(data, offset + 1)
+    return kind, data[offset:offset + size], offset + size
+
+def encodeMove(agentIndex, action):
+    """
+    One byte per move.  An action that is not a direction (the move an agent
+    crashed on) is kept as None.
+    """
+    if agentIndex > 31: raise Exception('Game logs hold at most 32 agents')
+    if action in MOVES: return chr(agentIndex << 3 | MOVES.index(action))
+    return chr(agentIndex << 3 | 7)
+
+def decodeMoves(data):
+    return [(ord(byte) >> 3, MOVES[ord(byte) & 7]) for byte in data]
+
+def layoutDigest(layoutText):
+    return hashlib.sha1('\n'.join(layoutText)).digest()
+
+def startingState(layout, numAgents):
+    import pacman
+    state = pacman.GameState()
+    state.initialize(layout, numAgents - 1)
+    return state
+
+##########
+# Writer #
+##########
+
+class GameLogWriter:
+    """
+    Appends games to the log at path.  Hook it up as game.recorder, or use
+    writeGame for games that were played elsewhere.  A snapshot is taken
+    every snapshotEvery moves, and a segment is closed every
+    gamesPerSegment games.
+    """
+
+    def __init__(self, path, snapshotEvery=64, gamesPerSegment=16):
+        self.path = path
+        self.snapshotEvery = snapshotEvery
+        self.gamesPerSegment = gamesPerSegment
+        self.index = loadIndex(path)
+        if os.path.exists(path):
+            self.file = open(path, 'r+b')
+            self.file.truncate(self.index['size'])
+            self.file.seek(self.index['size'])
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(MAGIC + chr(VERSION))
+        self.compressor = None
+        self.segmentOffset = None
+        self.segmentSize = 0
+        self.segmentGames = 0
+        self.pending = []
+        self.game = None
+        self.moves = []
+
+    def _write(self, record):
+        """
+        Adds record to the open segment, starting a new one if needed, and
+        returns where it lands: (segment offset, offset in the segment).
+        """
+        if self.compressor == None:
+            self.compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+            self.segmentOffset = self.file.tell()
+            self.segmentSize = 0
+            self.segmentGames = 0
+            self.frameKind = 'N'
+        position = (self.segmentOffset, self.segmentSize)
+        self.pending.append(self.compressor.compress(record))
+        self.segmentSize += len(record)
+        return position
+
+    def _flush(self, finish=False):
+        """
+        Writes what the open segment holds so far as a frame, closing the
+        segment if finish is set.
+        """
+        if self.compressor == None: return
+        if finish: self.pending.append(self.compressor.flush(zlib.Z_FINISH))
+        else: self.pending.append(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+        data = ''.join(self.pending)
+        self.pending = []
+        self.file.write(FRAME.pack(self.frameKind, len(data)) + data)
+        self.file.flush()
+        self.frameKind = 'C'
+        if finish: self.compressor = None
+
+    def startGame(self, state):
+        layoutText = state.data.layout.layoutText
+        digest = layoutDigest(layoutText)
+        if digest not in self.index['layouts']:
+            self.index['layouts'][digest] = self._write(encodeRecord('L', digest + '\n'.join(layoutText)))
+        start = self._write(encodeRecord('G', digest + encodeVarint(state.getNumAgents())))
+        self.game = {'layout': digest, 'numAgents': state.getNumAgents(), 'start': start,
+                     'snapshots': [], 'numMoves': 0}
+        self.initialState = state
+        self.moves = []
+
+    def _writeMoves(self):
+        if len(self.moves) > 0: self._write(encodeRecord('M', ''.join(self.moves)))
+        self.moves = []
+
+    def recordMove(self, state, agentIndex, action):
+        """
+        Records that agentIndex played action in state.
+        """
+        game = self.game
+        if game['numMoves'] > 0 and game['numMoves'] % self.snapshotEvery == 0:
+            import agentProcess
+            self._writeMoves()
+            delta = agentProcess.stateDelta(self.initialState, state)
+            snapshot = encodeVarint(game['numMoves']) + marshal.dumps(delta, MARSHAL_VERSION)
+            position = self._write(encodeRecord('S', snapshot))
+            game['snapshots'].append((game['numMoves'],) + position)
+            self._flush()
+        self.moves.append(encodeMove(agentIndex, action))
+        game['numMoves'] += 1
+
+    def endGame(self, state, outcome=None):
+        """
+        Ends the game, whose result is state's or, if given, the (score,
+        win, lose) outcome.
+        """
+        game = self.game
+        self._writeMoves()
+        if outcome == None: outcome = (state.getScore(), state.isWin(), state.isLose())
+        result = tuple(outcome) + (game['numMoves'],)
+        self._write(encodeRecord('E', marshal.dumps(result, MARSHAL_VERSION)))
+        game['score'], game['win'], game['lose'] = result[:3]
+        self.index['games'].append(game)
+        self.game = None
+        self.segmentGames += 1
+        self._flush(self.segmentGames >= self.gamesPerSegment)
+
+    def writeGame(self, layout, moveHistory, numAgents, outcome=None):
+        """
+        Records a game that was played elsewhere from its layout, its
+        (agentIndex, action) history and its number of agents.  The history
+        is replayed up to its first illegal action, which an agent that
+        crashed or timed out may have left at its end; outcome, the game's
+        (score, win, lose), is recorded as its result if given.
+        """
+        state = startingState(layout, numAgents)
+        self.startGame(state)
+        for agentIndex, action in moveHistory:
+            if state.isWin() or state.isLose() or action not in state.getLegalActions(agentIndex): break
+            self.recordMove(state, agentIndex, action)
+            state = state.generateSuccessor(agentIndex, action)
+        self.endGame(state, outcome)
+
+    def close(self):
+        self._flush(True)
+        self.index['size'] = self.file.tell()
+        self.file.close()
+        writeIndex(self.path, self.index)
+
+#########
+# Index #
+#########
+
+def indexPath(path):
+    return path + '.idx'
+
+def writeIndex(path, index):
+    f = open(indexPath(path), 'wb')
+    try: marshal.dump(index, f, MARSHAL_VERSION)
+    finally: f.close()
+
+def readFrames(f, offset):
+    """
+    Yields the (offset, kind, data) of the complete frames from offset on.
+    """
+    while True:
+        f.seek(offset)
+        header = f.read(FRAME.size)
+        if len(header) < FRAME.size: return
+        kind, size = FRAME.unpack(header)
+        data = f.read(size)
+        if len(data) < size or kind not in 'NC': return
+        yield offset, kind, data
+        offset += FRAME.size + size
+
+def scanLog(path):
+    """
+    Rebuilds the index of the log at path by reading it from the start.
+    Games cut off by a crash are left out, and 'size' is where the last
+    complete frame ends.
+    """
+    index = {'version': VERSION, 'size': len(MAGIC) + 1, 'layouts': {}, 'games': []}
+    f = open(path, 'rb')
+    try:
+        if f.read(len(MAGIC) + 1) != MAGIC + chr(VERSION):
+            raise Exception('%s is not a game log' % path)
+        segments = []
+        for offset, kind, data in readFrames(f, index['size']):
+            if kind == 'N': segments.append((offset, []))
+            if len(segments) == 0: break
+            segments[-1][1].append(data)
+            index['size'] = offset + FRAME.size + len(data)
+    finally:
+        f.close()
+
+    for segmentOffset, frames in segments:
+        data = zlib.decompressobj(-15).decompress(''.join(frames))
+        offset = 0
+        game = None
+        while offset < len(data):
+            start = offset
+            try:
+                kind, payload, offset = decodeRecord(data, offset)
+            except IndexError:
+                break
+            if offset > len(data): break
+            if kind == 'L':
+                index['layouts'][payload[:20]] = (segmentOffset, start)
+            elif kind == 'G':
+                game = {'layout': payload[:20], 'numAgents': decodeVarint(payload, 20)[0],
+                        'start': (segmentOffset, start), 'snapshots': [], 'numMoves': 0}
+            elif kind == 'M' and game != None:
+                game['numMoves'] += len(payload)
+            elif kind == 'S' and game != None:
+                game['snapshots'].append((decodeVarint(payload, 0)[0], segmentOffset, start))
+            elif kind == 'E' and game != None:
+                game['score'], game['win'], game['lose'] = marshal.loads(payload)[:3]
+                index['games'].append(game)
+                game = None
+    return index
+
+def loadIndex(path):
+    """
+    Returns the index of the log at path, from its index file while that is
+    up to date.
+    """
+    if not os.path.exists(path):
+        return {'version': VERSION, 'size': len(MAGIC) + 1, 'layouts': {}, 'games': []}
+    try:
+        f = open(indexPath(path), 'rb')
+        try: index = marshal.load(f)
+        finally: f.close()
+        if index['version'] == VERSION and index['size'] == os.path.getsize(path):
+            return index
+    except (IOError, EOFError, ValueError, TypeError, KeyError):
+        pass
+    return scanLog(path)
+
+##########
+# Reader #
+##########
+
+class GameLogReader:
+    """
+    Random access to the games of a log.  Games are numbered from 0 in the
+    order they were written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = loadIndex(path)
+        self.segments = {}
+        self.layouts = {}
+
+    def __len__(self):
+        return len(self.index['games'])
+
+    def getGameInfo(self, gameIndex):
+        """
+        Returns a dictionary with the game's numMoves, score, win and lose.
+        """
+        return self.index['games'][gameIndex]
+
+    def _segment(self, segmentOffset):
+        if segmentOffset not in self.segments:
+            f = open(self.path, 'rb')
+            try:
+                frames = []
+                for offset, kind, data in readFrames(f, segmentOffset):
+                    if kind == 'N' and offset != segmentOffset: break
+                    frames.append(data)
+            finally:
+                f.close()
+            if len(self.segments) > 8: self.segments = {}
+            self.segments[segmentOffset] = zlib.decompressobj(-15).decompress(''.join(frames))
+        return self.segments[segmentOffset]
+
+    def _record(self, position):
+        segmentOffset, offset = position
+        return decodeRecord(self._segment(segmentOffset), offset)
+
+    def getLayout(self, gameIndex):
+        import layout
+        digest = self.index['games'][gameIndex]['layout']
+        if digest not in self.layouts:
+            kind, payload, end = self._record(self.index['layouts'][digest])
+            self.layouts[digest] = layout.Layout(payload[20:].split('\n'))
+        return self.layouts[digest]
+
+    def getMoves(self, gameIndex):
+        """
+        Returns the game's (agentIndex, action) history.
+        """
+        return self._movesFrom(self.index['games'][gameIndex]['start'])
+
+    def _movesFrom(self, position, count=None):
+        """
+        Returns the moves recorded after the record at position, up to the
+        end of its game or the first count of them.
+        """
+        segmentOffset, offset = position
+        data = self._segment(segmentOffset)
+        kind, payload, offset = decodeRecord(data, offset)
+        moves = []
+        while kind != 'E' and (count == None or len(moves) < count):
+            kind, payload, offset = decodeRecord(data, offset)
+            if kind == 'M': moves += decodeMoves(payload)
+        return moves[:count]
+
+    def stateAt(self, gameIndex, move):
+        """
+        Returns the game's state before its move number move (counting from
+        0), rebuilt from the nearest snapshot at or before it.
+        """
+        import agentProcess
+        game = self.index['games'][gameIndex]
+        if move < 0 or move > game['numMoves']:
+            raise Exception('Game %d has %d moves' % (gameIndex, game['numMoves']))
+        state = startingState(self.getLayout(gameIndex), game['numAgents'])
+        start = 0
+        position = game['start']
+        # Snapshots are deltas from the starting state, so only the last one
+        # at or before move is needed
+        snapshots = game['snapshots']
+        i = bisect.bisect_right(snapshots, (move, sys.maxint)) - 1
+        if i >= 0:
+            snapshotMove, segmentOffset, offset = snapshots[i]
+            kind, payload, end = self._record((segmentOffset, offset))
+            start, deltaOffset = decodeVarint(payload, 0)
+            state = agentProcess.applyDelta(state, marshal.loads(payload[deltaOffset:]))
+            position = (segmentOffset, offset)
+        for agentIndex, action in self._movesFrom(position, move - start):
+            state = state.generateSuccessor(agentIndex, action)
+        return state
+
+def isGameLog(path):
+    f = open(path, 'rb')
+    try: return f.read(len(MAGIC)) == MAGIC
+    finally: f.close()
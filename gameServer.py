@@ -0,0 +1,440 @@
+# gameServer.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Hundreds of concurrent games in one process, on one event loop.
+
+Every game is a generator coroutine that yields a Future whenever it waits
+for an agent.  EventLoop multiplexes them over select(), so the number of
+games in flight is bounded by memory, not by processes or threads.  How an
+agent's move is waited for depends on the agent:
+
+  - ghostAgents ghosts are stepped inline; they never block
+  - agents with getActionAsync(state, loop), like RemoteAgent, return a
+    Future themselves and are waited on without a thread
+  - any other agent is called on the loop's thread pool executor
+
+A move that is not ready by its deadline is cancelled and counts as a
+timeout, as with catchExceptions in Game.run.  Agents that compute locally
+still hold the interpreter lock, so the runner pays off when agents wait on
+the network, as remote agents do:
+
+  python gameServer.py -l smallClassic -p remote:bigbox:5555:AlphaBetaAgent -n 500 --concurrency 200
+"""
+
+from util import TimeoutFunctionException
+import ghostAgents
+import heapq
+import os
+import Queue
+import select
+import sys
+import threading
+import time
+
+###########
+# Futures #
+###########
+
+class Future:
+    """
+    The eventual result or exception of a computation.
+    """
+
+    def __init__(self):
+        self.done = False
+        self.cancelled = False
+        self.result = None
+        self.exception = None
+        self.callbacks = []
+        self.cancelCallbacks = []
+
+    def addCallback(self, callback):
+        if self.done: callback(self)
+        else: self.callbacks.append(callback)
+
+    def onCancel(self, callback):
+        self.cancelCallbacks.append(callback)
+
+    def _finish(self):
+        self.done = True
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks: callback(self)
+
+    def setResult(self, result):
+        if self.done: return
+        self.result = result
+        self._finish()
+
+    def setException(self, exception):
+        if self.done: return
+        self.exception = exception
+        self._finish()
+
+    def cancel(self, exception=None):
+        """
+        Abandons the computation: runs the cancel callbacks and fails the
+        future with exception.
+        """
+        if self.done: return
+        self.cancelled = True
+        for callback in self.cancelCallbacks: callback()
+        self.setException(exception or Exception('Cancelled'))
+
+    def get(self):
+        if self.exception != None: raise self.exception
+        return self.result
+
+##############
+# Event loop #
+##############
+
+class EventLoop:
+    """
+    Runs callbacks, timers, socket readers and generator tasks on the
+    calling thread, and blocking calls on a pool of executor threads.
+    """
+
+    def __init__(self, executorThreads=16):
+        self.ready = []
+        self.timers = []
+        self.timerCount = 0
+        self.readers = {}
+        self.tasks = 0
+        self.lock = threading.Lock()
+        self.finished = []
+        self.wakeRead, self.wakeWrite = os.pipe()
+        self.jobs = Queue.Queue()
+        for i in range(executorThreads):
+            thread = threading.Thread(target=self._executorThread)
+            thread.daemon = True
+            thread.start()
+
+    def callSoon(self, callback, *args):
+        self.ready.append((callback, args))
+
+    def callLater(self, delay, callback, *args):
+        """
+        Runs callback after delay seconds; returns a handle for cancelTimer.
+        """
+        self.timerCount += 1
+        timer = [time.time() + delay, self.timerCount, callback, args]
+        heapq.heappush(self.timers, timer)
+        return timer
+
+    def cancelTimer(self, timer):
+        timer[2] = None
+
+    def addReader(self, sock, callback):
+        self.readers[sock.fileno()] = callback
+
+    def removeReader(self, sock):
+        self.readers.pop(sock.fileno(), None)
+
+    ############
+    # Executor #
+    ############
+
+    def _executorThread(self):
+        while True:
+            future, function, args = self.jobs.get()
+            if future.done: continue
+            try:
+                outcome = (function(*args), None)
+            except Exception, e:
+                outcome = (None, e)
+            self.lock.acquire()
+            try: self.finished.append((future, outcome))
+            finally: self.lock.release()
+            os.write(self.wakeWrite, 'x')
+
+    def runInExecutor(self, function, *args):
+        """
+        Calls function on an executor thread; returns a Future for its result.
+        A cancelled call still runs to the end, but its result is dropped.
+        """
+        future = Future()
+        self.jobs.put((future, function, args))
+        return future
+
+    def _collectFinished(self):
+        os.read(self.wakeRead, 4096)
+        self.lock.acquire()
+        try: finished, self.finished = self.finished, []
+        finally: self.lock.release()
+        for future, (result, exception) in finished:
+            if exception != None: future.setException(exception)
+            else: future.setResult(result)
+
+    #############
+    # Deadlines #
+    #############
+
+    def withDeadline(self, future, seconds):
+        """
+        Cancels future with TimeoutFunctionException unless it is done within
+        seconds; returns it for convenience.
+        """
+        if seconds == None or future.done: return future
+        timer = self.callLater(seconds, future.cancel, TimeoutFunctionException())
+        future.addCallback(lambda f: self.cancelTimer(timer))
+        return future
+
+    #########
+    # Tasks #
+    #########
+
+    def spawn(self, generator):
+        """
+        Runs a generator coroutine that yields Futures and is resumed with
+        their results, or has their exceptions thrown into it.  Returns a
+        Future that is done when the generator is.
+        """
+        self.tasks += 1
+        done = Future()
+        self.callSoon(self._step, generator, done, None, None)
+        return done
+
+    def _step(self, generator, done, value, exception):
+        try:
+            if exception != None: future = generator.throw(exception)
+            else: future = generator.send(value)
+        except StopIteration:
+            self.tasks -= 1
+            done.setResult(None)
+            return
+        except Exception, e:
+            self.tasks -= 1
+            done.setException(e)
+            return
+        future.addCallback(lambda f: self.callSoon(self._step, generator, done, f.result, f.exception))
+
+    def run(self):
+        """
+        Runs until every spawned task has finished.
+        """
+        while self.tasks > 0:
+            while self.ready:
+                ready, self.ready = self.ready, []
+                for callback, args in ready: callback(*args)
+            if self.tasks == 0: break
+
+            timeout = None
+            while self.timers and self.timers[0][2] == None: heapq.heappop(self.timers)
+            if self.timers: timeout = max(0, self.timers[0][0] - time.time())
+            fds = self.readers.keys() + [self.wakeRead]
+            readable = select.select(fds, [], [], timeout)[0]
+
+            for fd in readable:
+                if fd == self.wakeRead: self._collectFinished()
+                elif fd in self.readers: self.readers[fd]()
+            now = time.time()
+            while self.timers and self.timers[0][0] <= now:
+                deadline, count, callback, args = heapq.heappop(self.timers)
+                if callback != None: callback(*args)
+
+#########
+# Games #
+#########
+
+def agentCall(loop, agent, method, *args):
+    """
+    Returns a Future for agent.method(*args), run where the agent wants it.
+    """
+    future = Future()
+    if isinstance(agent, ghostAgents.GhostAgent):
+        try: future.setResult(getattr(agent, method)(*args))
+        except Exception, e: future.setException(e)
+        return future
+    if method == 'getAction' and 'getActionAsync' in dir(agent):
+        try: return agent.getActionAsync(args[0], loop)
+        except Exception, e:
+            future.setException(e)
+            return future
+    return loop.runInExecutor(getattr(agent, method), *args)
+
+def playGame(loop, game, moveTimeout=None, startupTimeout=None):
+    """
+    The coroutine of one game: Game.run with catchExceptions, waiting on
+    agents through the loop.  moveTimeout and startupTimeout default to the
+    rules' limits, and the rules' warning and total time limits apply as
+    they do in Game.run.
+    """
+    rules = game.rules
+    game.numMoves = 0
+    for index, agent in enumerate(game.agents):
+        if 'registerInitialState' in dir(agent):
+            deadline = startupTimeout
+            if deadline == None: deadline = rules.getMaxStartupTime(index)
+            startTime = time.time()
+            try:
+                yield loop.withDeadline(agentCall(loop, agent, 'registerInitialState', game.state.deepCopy()), deadline)
+            except TimeoutFunctionException:
+                print >>sys.stderr, "Agent %d ran out of time on startup!" % index
+                game.agentTimeout = True
+                game._agentCrash(index, quiet=True)
+                return
+            except Exception, e:
+                print >>sys.stderr, "Agent %d crashed on startup: %s" % (index, e)
+                game._agentCrash(index, quiet=True)
+                return
+            game.totalAgentTimes[index] += time.time() - startTime
+
+    agentIndex = game.startingIndex
+    numAgents = len(game.agents)
+    while not game.gameOver:
+        agent = game.agents[agentIndex]
+        deadline = moveTimeout
+        if deadline == None: deadline = rules.getMoveTimeout(agentIndex)
+        startTime = time.time()
+        try:
+            action = yield loop.withDeadline(agentCall(loop, agent, 'getAction', game.state.deepCopy(False)), deadline)
+        except TimeoutFunctionException:
+            print >>sys.stderr, "Agent %d timed out on a single move!" % agentIndex
+            game.agentTimeout = True
+            game._agentCrash(agentIndex, quiet=True)
+            return
+        except Exception, e:
+            print >>sys.stderr, "Agent %d crashed: %s" % (agentIndex, e)
+            game._agentCrash(agentIndex, quiet=True)
+            return
+        moveTime = time.time() - startTime
+        if moveTime > rules.getMoveWarningTime(agentIndex):
+            game.totalAgentTimeWarnings[agentIndex] += 1
+            print >>sys.stderr, "Agent %d took too long to make a move! This is warning %d" % (agentIndex, game.totalAgentTimeWarnings[agentIndex])
+            if game.totalAgentTimeWarnings[agentIndex] > rules.getMaxTimeWarnings(agentIndex):
+                print >>sys.stderr, "Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, game.totalAgentTimeWarnings[agentIndex])
+                game.agentTimeout = True
+                game._agentCrash(agentIndex, quiet=True)
+                return
+        game.totalAgentTimes[agentIndex] += moveTime
+        if game.totalAgentTimes[agentIndex] > rules.getMaxTotalTime(agentIndex):
+            print >>sys.stderr, "Agent %d ran out of time! (time: %1.2f)" % (agentIndex, game.totalAgentTimes[agentIndex])
+            game.agentTimeout = True
+            game._agentCrash(agentIndex, quiet=True)
+            return
+
+        game.moveHistory.append( (agentIndex, action) )
+        try:
+            game.state = game.state.generateSuccessor( agentIndex, action )
+        except Exception, e:
+            print >>sys.stderr, "Agent %d made an illegal move: %s" % (agentIndex, e)
+            game._agentCrash(agentIndex, quiet=True)
+            return
+        game.rules.process(game.state, game)
+        agentIndex = ( agentIndex + 1 ) % numAgents
+
+    for index, agent in enumerate(game.agents):
+        if 'final' in dir(agent):
+            try:
+                yield agentCall(loop, agent, 'final', game.state)
+            except Exception, e:
+                print >>sys.stderr, "Agent %d crashed in final: %s" % (index, e)
+                game._agentCrash(index, quiet=True)
+                return
+
+def runConcurrentGames(layout, makePacman, makeGhosts, numGames, concurrency=100,
+                       moveTimeout=None, startupTimeout=None, executorThreads=16, record=False, timeout=30):
+    """
+    Plays numGames games with at most concurrency of them in flight at once
+    and returns their GameResults in game order.  Agents cannot be shared
+    between games in flight, so makePacman() and makeGhosts() are called for
+    every game.  Games are played under ClassicGameRules(timeout,
+    moveTimeout), with the time limits of a local game; the time a move
+    waits behind other games counts against it.  Interleaved games draw
+    from the shared random module in no fixed order, so runs are not
+    reproducible from a seed.  With record, games are appended to the game
+    log in the order they finish.
+    """
+    import pacman, textDisplay
+    loop = EventLoop(executorThreads)
+    recorder = pacman.openRecorder(record)
+    results = [None] * numGames
+    display = textDisplay.NullGraphics()
+    queue = range(numGames)
+
+    def startGame():
+        if not queue: return
+        gameIndex = queue.pop(0)
+        rules = pacman.ClassicGameRules(timeout, moveTimeout)
+        game = rules.newGame(layout, makePacman(), makeGhosts(), display, True, True)
+        done = loop.spawn(playGame(loop, game, moveTimeout, startupTimeout))
+        done.addCallback(lambda f: finishGame(gameIndex, game, f))
+
+    def finishGame(gameIndex, game, done):
+        if done.exception != None: raise done.exception
+        result = pacman.GameResult(game, keepHistory=recorder != None)
+        results[gameIndex] = result
+        if result.win: print "Pacman emerges victorious! Score: %d" % result.score
+        elif result.lose: print "Pacman died! Score: %d" % result.score
+        if recorder != None:
+            recorder.writeGame(layout, result.moveHistory, game.state.getNumAgents(), (result.score, result.win, result.lose))
+        startGame()
+
+    for i in range(min(concurrency, numGames)):
+        startGame()
+    try:
+        loop.run()
+    finally:
+        if recorder != None: recorder.close()
+    if numGames > 0:
+        pacman.printSummary([result.score for result in results], [result.win for result in results])
+    return results
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python gameServer.py <options>
+    EXAMPLES:   python gameServer.py -l smallClassic -p remote:bigbox:5555:AlphaBetaAgent -n 500
+                    - plays 500 games against a remote Pacman, 100 at a time
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=100,
+                      help='the number of GAMES to play [Default: %default]', metavar='GAMES')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE from which to load the map layout [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-p', '--pacman', dest='pacman', default='ReflexAgent',
+                      help='the agent TYPE in the pacmanAgents module to use [Default: %default]', metavar='TYPE')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default=None,
+                      help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='the ghost agent TYPE in the ghostAgents module to use [Default: %default]', metavar='TYPE')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('--concurrency', dest='concurrency', type='int', default=100,
+                      help='the number of games in flight at once [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='float', default=30,
+                      help='Maximum length of time an agent can spend computing in a single game [Default: %default]')
+    parser.add_option('--moveTimeout', dest='moveTimeout', type='float', default=None,
+                      help='Maximum length of time in seconds an agent can spend on a single move [Default: --timeout]')
+    parser.add_option('--threads', dest='threads', type='int', default=16,
+                      help='the number of executor threads for blocking agents [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import layout, pacman
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    pacmanType = pacman.loadAgent(options.pacman, True)
+    agentOpts = pacman.parseAgentArgs(options.agentArgs)
+    ghostType = pacman.loadAgent(options.ghost, True)
+    numGhosts = min(options.numGhosts, lay.getNumGhosts())
+    runConcurrentGames(lay, lambda: pacmanType(**agentOpts),
+                       lambda: [ghostType(i + 1) for i in range(numGhosts)],
+                       options.numGames, options.concurrency, options.moveTimeout,
+                       executorThreads=options.threads, timeout=options.timeout)
@@ -0,0 +1,189 @@
+# moveMetrics.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Per-move latency histograms, exported in the Prometheus text format.
+
+A Game with a MoveMetrics in its metrics field times every move of every
+agent, on the wall clock and in CPU time, from the observation to the
+action.  The metrics keep a histogram per agent and clock, so memory does
+not grow with the number of moves, along with counts of games and moves.
+With a path, they are written to it every interval seconds and when the
+run ends:
+
+  python pacman.py -q -p AlphaBetaAgent -a depth=3 -n 100 --metrics moves.prom
+
+The file holds, per agent and clock, a pacman_move_seconds histogram,
+pacman_move_quantile_seconds gauges for p50, p90 and p99 (estimated to
+within a fifth of their value) and pacman_move_max_seconds, then the
+pacman_games_total and pacman_moves_total counters and games and moves per
+second since the metrics were made.
+"""
+
+import bisect
+import os
+import time
+
+# Bucket bounds of the exported histograms, in seconds
+EXPORT_BUCKETS = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+# Bucket bounds quantiles are estimated from: a quarter octave apart, from
+# 10 microseconds to nearly 3 minutes
+FINE_BUCKETS = [1e-5 * 2 ** (i / 4.0) for i in range(97)]
+
+QUANTILES = [0.5, 0.9, 0.99]
+
+class LatencyHistogram:
+    """
+    Counts of durations by bucket, with their sum, count and maximum.
+    """
+
+    def __init__(self):
+        self.fine = [0] * (len(FINE_BUCKETS) + 1)
+        self.exported = [0] * (len(EXPORT_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.fine[bisect.bisect_left(FINE_BUCKETS, seconds)] += 1
+        self.exported[bisect.bisect_left(EXPORT_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        if seconds > self.max: self.max = seconds
+
+    def merge(self, other):
+        self.fine = [a + b for a, b in zip(self.fine, other.fine)]
+        self.exported = [a + b for a, b in zip(self.exported, other.exported)]
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        """
+        Estimates the duration below which a share q of them fall, by
+        interpolating within its bucket as Prometheus' histogram_quantile
+        does.
+        """
+        if self.count == 0: return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.fine):
+            if count and seen + count >= rank:
+                low = 0.0
+                if i > 0: low = FINE_BUCKETS[i - 1]
+                high = self.max
+                if i < len(FINE_BUCKETS): high = min(FINE_BUCKETS[i], self.max)
+                return low + (high - low) * (rank - seen) / count
+            seen += count
+        return self.max
+
+class MoveMetrics:
+    """
+    Move latencies of the games it is attached to, by agent index.  Agents
+    are named by the class of the agent that last played at an index.
+    """
+
+    def __init__(self, path=None, interval=10):
+        self.path = path
+        self.interval = interval
+        self.histograms = {}
+        self.agentNames = {}
+        self.games = 0
+        self.moves = 0
+        self.start = time.time()
+        self.lastExport = self.start
+
+    def recordMove(self, agentIndex, wallSeconds, cpuSeconds):
+        if agentIndex not in self.histograms:
+            self.histograms[agentIndex] = (LatencyHistogram(), LatencyHistogram())
+        wall, cpu = self.histograms[agentIndex]
+        wall.observe(wallSeconds)
+        cpu.observe(cpuSeconds)
+        self.moves += 1
+        if self.path != None and time.time() - self.lastExport >= self.interval: self.export()
+
+    def endGame(self, game):
+        for index, agent in enumerate(game.agents):
+            self.agentNames[index] = agent.__class__.__name__
+        self.games += 1
+
+    def merge(self, other):
+        """
+        Adds in the metrics of games played elsewhere, such as a worker
+        process.
+        """
+        for index, (wall, cpu) in other.histograms.items():
+            if index not in self.histograms:
+                self.histograms[index] = (LatencyHistogram(), LatencyHistogram())
+            self.histograms[index][0].merge(wall)
+            self.histograms[index][1].merge(cpu)
+        self.agentNames.update(other.agentNames)
+        self.games += other.games
+        self.moves += other.moves
+        if self.path != None and time.time() - self.lastExport >= self.interval: self.export()
+
+    def prometheusText(self):
+        elapsed = max(time.time() - self.start, 1e-9)
+        series = []
+        for index in sorted(self.histograms):
+            for clock, histogram in zip(['wall', 'cpu'], self.histograms[index]):
+                labels = 'agent="%d",type="%s",clock="%s"' % (index, self.agentNames.get(index, ''), clock)
+                series.append((labels, histogram))
+
+        lines = ['# HELP pacman_move_seconds Time an agent took to choose a move.',
+                 '# TYPE pacman_move_seconds histogram']
+        for labels, histogram in series:
+            cumulative = 0
+            for bound, count in zip(EXPORT_BUCKETS, histogram.exported):
+                cumulative += count
+                lines.append('pacman_move_seconds_bucket{%s,le="%g"} %d' % (labels, bound, cumulative))
+            lines.append('pacman_move_seconds_bucket{%s,le="+Inf"} %d' % (labels, histogram.count))
+            lines.append('pacman_move_seconds_sum{%s} %.9g' % (labels, histogram.sum))
+            lines.append('pacman_move_seconds_count{%s} %d' % (labels, histogram.count))
+        lines += ['# HELP pacman_move_quantile_seconds Estimated quantiles of the time an agent took to choose a move.',
+                  '# TYPE pacman_move_quantile_seconds gauge']
+        for labels, histogram in series:
+            for q in QUANTILES:
+                lines.append('pacman_move_quantile_seconds{%s,quantile="%g"} %.9g' % (labels, q, histogram.quantile(q)))
+        lines += ['# HELP pacman_move_max_seconds The longest time an agent took to choose a move.',
+                  '# TYPE pacman_move_max_seconds gauge']
+        for labels, histogram in series:
+            lines.append('pacman_move_max_seconds{%s} %.9g' % (labels, histogram.max))
+        lines += ['# HELP pacman_games_total Games played.',
+                  '# TYPE pacman_games_total counter',
+                  'pacman_games_total %d' % self.games,
+                  '# HELP pacman_moves_total Moves made by all agents.',
+                  '# TYPE pacman_moves_total counter',
+                  'pacman_moves_total %d' % self.moves,
+                  '# HELP pacman_games_per_second Games played per second of the run.',
+                  '# TYPE pacman_games_per_second gauge',
+                  'pacman_games_per_second %.9g' % (self.games / elapsed),
+                  '# HELP pacman_moves_per_second Moves made per second of the run.',
+                  '# TYPE pacman_moves_per_second gauge',
+                  'pacman_moves_per_second %.9g' % (self.moves / elapsed)]
+        return '\n'.join(lines) + '\n'
+
+    def export(self):
+        """
+        Writes the metrics to path, replacing the file whole so readers
+        never see half of it.
+        """
+        self.lastExport = time.time()
+        if self.path == None: return
+        temporary = self.path + '.tmp'
+        f = open(temporary, 'w')
+        try: f.write(self.prometheusText())
+        finally: f.close()
+        os.rename(temporary, self.path)
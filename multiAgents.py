@@ -13,11 +13,26 @@
 
 
 from util import manhattanDistance
-from game import Directions
+from game import Directions, Actions
 import sys
 import random, util
 
 from game import Agent
+from ghostAgents import DirectionalGhost, RandomGhost
+from openingBook import likelyReplies
+import threading
+import topology
+import occupancy
+
+# Pseudo-action used by the search for ghosts that are not expanded
+PASS = 'Pass'
+
+class PonderInterrupted(Exception):
+    """Raised inside a ponder search when the real move comes in"""
+    pass
+
+# Statistics the search agents count; a ponder search counts only if used
+SEARCH_COUNTERS = ['prunedMoves', 'collapsedGhostNodes', 'tablebaseHits', 'bookHits']
 
 class ReflexAgent(Agent):
     """
@@ -91,6 +106,13 @@ class ReflexAgent(Agent):
             
         return score
 
+def parseFlag(value):
+    """
+      Agent options arrive as strings from the command line (or as 1 for a
+      bare flag such as -a pruneDeadEnds); returns their boolean value.
+    """
+    return str(value) in ['True', 'true', '1']
+
 def scoreEvaluationFunction(currentGameState):
     """
       This default evaluation function just returns the score of the state.
@@ -116,17 +138,236 @@ class MultiAgentSearchAgent(Agent):
       is another abstract class.
     """
 
-    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2'):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', pruneDeadEnds = 'False',
+                 ghostRadius = '0', radiusMetric = 'manhattan', distantGhostMove = 'pass',
+                 tablebase = '', openingBook = '', ponder = 'False', ponderReplies = '4',
+                 ponderModel = 'directional'):
         self.index = 0 # Pacman is always agent index 0
         self.evaluationFunction = util.lookup(evalFn, globals())
         self.depth = int(depth)
+        self.pruneDeadEnds = parseFlag(pruneDeadEnds)
+        self.prunedMoves = 0 # Moves removed by forward pruning so far
+
+        # Selective ghost expansion: only ghosts within ghostRadius of Pacman
+        # (0 means every ghost) branch on all their moves.
+        self.ghostRadius = int(ghostRadius)
+        if radiusMetric not in ['manhattan', 'maze']:
+            raise Exception('Unknown radiusMetric ' + str(radiusMetric))
+        self.radiusMetric = radiusMetric
+        if distantGhostMove not in ['pass', 'directional']:
+            raise Exception('Unknown distantGhostMove ' + str(distantGhostMove))
+        self.distantGhostMove = distantGhostMove
+        self.collapsedGhostNodes = 0 # Ghost nodes searched with a single move
+
+        # Endgame tablebase (see tablebase.py) probed at Pacman's nodes by
+        # the minimax searches only
+        self.tablebase = None
+        if tablebase:
+            import tablebase as tb
+            self.tablebase = tb.Tablebase(tablebase)
+        self.tablebaseHits = 0
+
+        # Opening book (see openingBook.py), used while its layout is played
+        self.openingBook = None
+        if openingBook:
+            import openingBook as ob
+            self.openingBook = ob.loadOpeningBook(openingBook)
+        self.activeBook = None
+        self.bookHits = 0
+
+        # Pondering: while the ghosts move, search the ponderReplies most
+        # likely positions Pacman can face next, under the ponderModel ghosts
+        self.ponder = parseFlag(ponder)
+        self.ponderReplies = int(ponderReplies)
+        if ponderModel not in ['directional', 'random']:
+            raise Exception('Unknown ponderModel ' + str(ponderModel))
+        self.ponderModel = ponderModel
+        self.ponderResults = {}
+        self.ponderThread = None
+        self.ponderAbort = False
+        self.ponderHits = 0 # Moves answered from a finished ponder search
+
+    def registerInitialState(self, gameState):
+        """
+          Turns the opening book on for games on the layout it was built for.
+        """
+        self.stopPondering()
+        self.ponderResults = {}
+        self.activeBook = None
+        if self.openingBook is not None and self.openingBook.matches(gameState.data.layout):
+            self.activeBook = self.openingBook
+
+    def getAction(self, gameState):
+        """
+          Returns chooseAction(gameState), from the ponder results when the
+          position was searched during the ghosts' turns.
+        """
+        if not self.ponder:
+            return self.chooseAction(gameState)
+        self.stopPondering()
+        pondered = self.ponderResults.get(gameState)
+        if pondered is not None:
+            action, counts = pondered
+            self.ponderHits += 1
+            for name, count in zip(SEARCH_COUNTERS, counts):
+                setattr(self, name, getattr(self, name) + count)
+        else:
+            action = self.chooseAction(gameState)
+        self.startPondering(gameState, action)
+        return action
+
+    def startPondering(self, gameState, action):
+        """
+          Starts searching the likely positions after action in the
+          background.  Searches are deterministic, so a finished one gives the
+          move chooseAction would.
+        """
+        self.ponderResults = {}
+        nextState = gameState.generateSuccessor(0, action)
+        if nextState.isWin() or nextState.isLose():
+            return
+        if self.ponderModel == 'directional': ghostType = DirectionalGhost
+        else: ghostType = RandomGhost
+        ghosts = [ghostType(index) for index in range(1, nextState.getNumAgents())]
+        replies = [reply for reply in likelyReplies(nextState, ghosts)
+                   if not reply[1].isWin() and not reply[1].isLose()]
+        replies.sort(key=lambda reply: -reply[0])
+        states = [state for prob, state in replies[:self.ponderReplies]]
+
+        self.ponderAbort = False
+        self.ponderThread = threading.Thread(target=self.ponderStates, args=(states,))
+        self.ponderThread.daemon = True
+        self.ponderThread.start()
+
+    def ponderStates(self, states):
+        """
+          Searches states in turn.  The statistics each search counts are
+          taken back out and kept with its move, to be added in only if the
+          move is used.
+        """
+        for state in states:
+            before = [getattr(self, name) for name in SEARCH_COUNTERS]
+            try:
+                action = self.chooseAction(state)
+            except PonderInterrupted:
+                return
+            finally:
+                counts = [getattr(self, name) - count for name, count in zip(SEARCH_COUNTERS, before)]
+                for name, count in zip(SEARCH_COUNTERS, before): setattr(self, name, count)
+            self.ponderResults[state] = (action, counts)
+
+    def final(self, gameState):
+        """
+          Stops pondering once the game is over.
+        """
+        self.stopPondering()
+        self.ponderResults = {}
+
+    def stopPondering(self):
+        if self.ponderThread is None: return
+        self.ponderAbort = True
+        self.ponderThread.join()
+        self.ponderThread = None
+
+    def getBookAction(self, gameState):
+        """
+          Returns the opening book move for gameState, or None once the game
+          has left the book.
+        """
+        if self.activeBook is None: return None
+        action = self.activeBook.getMove(gameState)
+        if action is None or action not in gameState.getLegalActions(0):
+            return None
+        self.bookHits += 1
+        return action
+
+    def probeTablebase(self, gameState):
+        """
+          Returns (exact value, best action) if gameState is a Pacman-to-move
+          position covered by the tablebase, otherwise None.  The value is the
+          final score of the game under minimax play.
+        """
+        if self.tablebase is None: return None
+        entry = self.tablebase.probe(gameState)
+        if entry is None: return None
+        self.tablebaseHits += 1
+        value, action = entry
+        return (gameState.getScore() + value, action)
+
+    def getSearchActions(self, gameState, agentIndex):
+        """
+          Returns the actions the search expands for agentIndex at gameState.
+          With no search options turned on these are simply the legal actions.
+        """
+        if self.ponderAbort and threading.current_thread() is self.ponderThread:
+            raise PonderInterrupted()
+        # Off the main thread no alarm can stop a search that runs over
+        util.checkDeadline()
+        if agentIndex != 0 and self.ghostRadius > 0 and self.isDistantGhost(gameState, agentIndex):
+            self.collapsedGhostNodes += 1
+            return [self.getDistantGhostMove(gameState, agentIndex)]
+        legalMoves = gameState.getLegalActions(agentIndex)
+        if agentIndex == 0 and self.pruneDeadEnds:
+            return self.pruneDeadEndMoves(gameState, legalMoves)
+        return legalMoves
+
+    def generateSearchSuccessor(self, gameState, agentIndex, action):
+        """
+          Returns the state reached in the search tree when agentIndex plays
+          action.  PASS leaves the state untouched.
+        """
+        if action == PASS:
+            return gameState
+        return gameState.generateSuccessor(agentIndex, action)
+
+    def isDistantGhost(self, gameState, agentIndex):
+        pacmanPos = gameState.getPacmanPosition()
+        ghostPos = gameState.getGhostPosition(agentIndex)
+        if self.radiusMetric == 'maze':
+            distance = topology.getTopology(gameState.data.layout).getMazeDistance(pacmanPos, ghostPos)
+        else:
+            distance = manhattanDistance(pacmanPos, ghostPos)
+        return distance > self.ghostRadius
+
+    def getDistantGhostMove(self, gameState, agentIndex):
+        """
+          The single move searched for a ghost outside ghostRadius: either no
+          move at all, or the most likely move of a DirectionalGhost.
+        """
+        if self.distantGhostMove == 'pass':
+            return PASS
+        dist = DirectionalGhost(agentIndex).getDistribution(gameState)
+        if len(dist) == 0:
+            return PASS
+        return dist.argMax()
+
+    def pruneDeadEndMoves(self, gameState, legalMoves):
+        """
+          Drops Pacman moves into dead ends that are deeper than the Manhattan
+          distance to the nearest non-scared ghost, so the search never has to
+          discover the trap by itself.  Never drops every move.
+        """
+        pos = gameState.getPacmanPosition()
+        ghostDists = [manhattanDistance(pos, ghost.getPosition()) for ghost in gameState.getGhostStates()
+                      if ghost.scaredTimer <= 0]
+        if len(ghostDists) == 0:
+            return legalMoves
+        nearestGhost = min(ghostDists)
+
+        topo = topology.getTopology(gameState.data.layout)
+        keptMoves = [action for action in legalMoves
+                     if topo.getDeadEndDepth(pos, Actions.getSuccessor(pos, action)) <= nearestGhost]
+        if len(keptMoves) == 0:
+            return legalMoves
+        self.prunedMoves += len(legalMoves) - len(keptMoves)
+        return keptMoves
 
 class MinimaxAgent(MultiAgentSearchAgent):
     """
       Your minimax agent (question 2)
     """
 
-    def getAction(self, gameState):
+    def chooseAction(self, gameState):
         """
           Returns the minimax action from the current gameState using self.depth
           and self.evaluationFunction.
@@ -143,8 +384,15 @@ class MinimaxAgent(MultiAgentSearchAgent):
           gameState.getNumAgents():
             Returns the total number of agents in the game
         """
+        bookAction = self.getBookAction(gameState)
+        if bookAction is not None:
+            return bookAction
+        exact = self.probeTablebase(gameState)
+        if exact is not None:
+            return exact[1]
+
         numAgents = gameState.getNumAgents()
-        legalMoves = gameState.getLegalActions(0)
+        legalMoves = self.getSearchActions(gameState, 0)
         bestVal = -1 * sys.maxint
         bestAction = None
         for action in legalMoves:
@@ -159,8 +407,13 @@ class MinimaxAgent(MultiAgentSearchAgent):
         if depth == 0 or gameState.isWin() or gameState.isLose():
             return self.evaluationFunction(gameState)
 
-        legalMoves = gameState.getLegalActions(agentIndex)
-        successorStates = [gameState.generateSuccessor(agentIndex, action) for action in legalMoves]
+        if agentIndex == 0:
+            exact = self.probeTablebase(gameState)
+            if exact is not None:
+                return exact[0]
+
+        legalMoves = self.getSearchActions(gameState, agentIndex)
+        successorStates = [self.generateSearchSuccessor(gameState, agentIndex, action) for action in legalMoves]
         
         if agentIndex == 0:
             val = -1 * sys.maxint
@@ -180,18 +433,26 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
     """
       Your minimax agent with alpha-beta pruning (question 3)
     """
-    def getAction(self, gameState):
+    def chooseAction(self, gameState):
+        bookAction = self.getBookAction(gameState)
+        if bookAction is not None:
+            return bookAction
         return self.minimax_w_pruning(gameState, self.depth, gameState.getNumAgents(), 0, -1 * sys.maxint, sys.maxint)[1]
 
     def minimax_w_pruning(self, gameState, depth, numAgents, agentIndex, alpha, beta):
         if depth == 0 or gameState.isWin() or gameState.isLose():
             return (self.evaluationFunction(gameState), None)
 
+        if agentIndex == 0:
+            exact = self.probeTablebase(gameState)
+            if exact is not None:
+                return exact
+
         if agentIndex == 0:
             bestVal = -1 * sys.maxint
             bestAction = None
-            for action in gameState.getLegalActions(agentIndex):
-                successorState = gameState.generateSuccessor(agentIndex, action)
+            for action in self.getSearchActions(gameState, agentIndex):
+                successorState = self.generateSearchSuccessor(gameState, agentIndex, action)
                 curVal, curAction = self.minimax_w_pruning(successorState, depth, numAgents, agentIndex + 1, alpha, beta)
                 if curVal > bestVal:
                   bestVal = curVal
@@ -203,8 +464,8 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
         else:
             bestVal = sys.maxint
             bestAction = None
-            for action in gameState.getLegalActions(agentIndex):
-                successorState = gameState.generateSuccessor(agentIndex, action)
+            for action in self.getSearchActions(gameState, agentIndex):
+                successorState = self.generateSearchSuccessor(gameState, agentIndex, action)
                 curVal = sys.maxint
                 if agentIndex == (numAgents - 1):
                     curVal, curAction = self.minimax_w_pruning(successorState, depth - 1, numAgents, 0, alpha, beta)
@@ -221,10 +482,72 @@ class AlphaBetaAgent(MultiAgentSearchAgent):
 class ExpectimaxAgent(MultiAgentSearchAgent):
     """
       Your expectimax agent (question 4)
+
+      With leafModel=occupancy the ghosts are not branched on at all.  The
+      search only expands Pacman's moves, and each ghost's position
+      distribution is propagated forward one step per ply with the
+      ghostModel (random or directional) transition model from occupancy.py.
+      The probability of running into a ghost along the path is charged
+      against the leaf evaluation at dangerWeight points.
+
+      Tablebase values are minimax values, which assume the ghosts play their
+      best against Pacman, and would be too pessimistic next to the averages
+      of chance nodes; this agent does not take a tablebase.
     """
-    def getAction(self, gameState):
+    def __init__(self, evalFn = 'scoreEvaluationFunction', depth = '2', leafModel = 'chance',
+                 ghostModel = 'random', dangerWeight = '500', **args):
+        if args.get('tablebase'):
+            raise Exception('A tablebase holds minimax values; use it with MinimaxAgent or AlphaBetaAgent')
+        MultiAgentSearchAgent.__init__(self, evalFn, depth, **args)
+        if leafModel not in ['chance', 'occupancy']:
+            raise Exception('Unknown leafModel ' + str(leafModel))
+        if ghostModel not in occupancy.GHOST_MODELS:
+            raise Exception('Unknown ghostModel ' + str(ghostModel))
+        self.leafModel = leafModel
+        self.ghostModel = ghostModel
+        self.dangerWeight = float(dangerWeight)
+
+    def chooseAction(self, gameState):
+        bookAction = self.getBookAction(gameState)
+        if bookAction is not None:
+            return bookAction
+        if self.leafModel == 'occupancy':
+            return self.occupancySearch(gameState)
         return self.expectimax(gameState, self.depth, gameState.getNumAgents(), 0, -1 * sys.maxint, sys.maxint)[1]
 
+    def occupancySearch(self, gameState):
+        model = occupancy.getOccupancyModel(gameState.data.layout, self.ghostModel)
+        ghostOccupancy = model.propagate(gameState, self.depth)
+        bestVal = None
+        bestAction = None
+        for action in self.getSearchActions(gameState, 0):
+            successorState = self.generateSearchSuccessor(gameState, 0, action)
+            curVal = self.occupancyValue(successorState, 1, 1.0, ghostOccupancy)
+            if bestVal is None or curVal > bestVal:
+                bestVal = curVal
+                bestAction = action
+        return bestAction
+
+    def occupancyValue(self, gameState, ply, survival, ghostOccupancy):
+        """
+          Value of the Pacman-only search node reached after ply Pacman moves.
+          Pacman is caught on this ply if a ghost was already in the cell he
+          moved into, or if one moves into it afterwards.
+        """
+        pos = gameState.getPacmanPosition()
+        danger = max(ghostOccupancy[ply - 1][pos], ghostOccupancy[ply][pos])
+        survival *= 1.0 - danger
+        if ply == self.depth or gameState.isWin() or gameState.isLose():
+            return self.evaluationFunction(gameState) - self.dangerWeight * (1.0 - survival)
+
+        bestVal = None
+        for action in self.getSearchActions(gameState, 0):
+            successorState = self.generateSearchSuccessor(gameState, 0, action)
+            curVal = self.occupancyValue(successorState, ply + 1, survival, ghostOccupancy)
+            if bestVal is None or curVal > bestVal:
+                bestVal = curVal
+        return bestVal
+
     def expectimax(self, gameState, depth, numAgents, agentIndex, alpha, beta):
         if depth == 0 or gameState.isWin() or gameState.isLose():
             return (self.evaluationFunction(gameState), None)
@@ -232,8 +555,8 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
         if agentIndex == 0:
             bestVal = -1 * sys.maxint
             bestAction = None
-            for action in gameState.getLegalActions(agentIndex):
-                successorState = gameState.generateSuccessor(agentIndex, action)
+            for action in self.getSearchActions(gameState, agentIndex):
+                successorState = self.generateSearchSuccessor(gameState, agentIndex, action)
                 curVal, curAction = self.expectimax(successorState, depth, numAgents, agentIndex + 1, alpha, beta)
                 if curVal > bestVal:
                   bestVal = curVal
@@ -243,9 +566,9 @@ class ExpectimaxAgent(MultiAgentSearchAgent):
             bestVal = sys.maxint
             bestAction = None
             avgVal = 0
-            potentialActions = gameState.getLegalActions(agentIndex)
+            potentialActions = self.getSearchActions(gameState, agentIndex)
             for action in potentialActions:
-                successorState = gameState.generateSuccessor(agentIndex, action)
+                successorState = self.generateSearchSuccessor(gameState, agentIndex, action)
                 curVal = sys.maxint
                 if agentIndex == (numAgents - 1):
                     curVal, curAction = self.expectimax(successorState, depth - 1, numAgents, 0, alpha, beta)
@@ -448,6 +448,11 @@ class EvalAgentTest(testClasses.TestCase):
 
         self.maxPoints = sum([len(t) for t in [self.scoreThresholds, self.nonTimeoutThresholds, self.winsThresholds]])
         self.agentArgs = testDict.get('agentArgs', '')
+        self.moveLimit = None
+        if 'maxMoves' in testDict or 'stallRepeats' in testDict:
+            maxMoves = int(testDict['maxMoves']) if 'maxMoves' in testDict else None
+            stallRepeats = int(testDict['stallRepeats']) if 'stallRepeats' in testDict else None
+            self.moveLimit = pacman.MoveLimit(maxMoves, testDict.get('adjudication', 'score'), stallRepeats)
 
 
     def execute(self, grades, moduleDict, solutionDict):
@@ -462,7 +467,7 @@ class EvalAgentTest(testClasses.TestCase):
         disp = self.question.getDisplay()
 
         random.seed(self.seed)
-        games = pacman.runGames(lay, agent, self.ghosts, disp, self.numGames, False, catchExceptions=True, timeout=self.maxTime)
+        games = pacman.runGames(lay, agent, self.ghosts, disp, self.numGames, False, catchExceptions=True, timeout=self.maxTime, moveLimit=self.moveLimit)
         totalTime = time.time() - startTime
 
         stats = {'time': totalTime, 'wins': [g.state.isWin() for g in games].count(True),
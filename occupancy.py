@@ -0,0 +1,146 @@
+# occupancy.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Forward propagation of ghost position distributions.
+
+A ghost's state is its cell together with its heading, because ghosts may
+not turn around except in a dead end.  The ghost policies in ghostAgents.py
+turn the set of those states into a Markov chain; pushing a ghost's current
+state through the chain for k steps gives the probability of finding that
+ghost in each cell after k moves.  The chain is sparse (at most four
+successors per state), so distributions are stored as Counters and each
+step is a sparse matrix-vector product.
+"""
+
+from game import Directions, Actions
+from util import manhattanDistance, nearestPoint
+import util
+import topology
+
+OCCUPANCY_CACHE = {}
+
+# Ghost policies from ghostAgents.py that can be modelled
+GHOST_MODELS = ['random', 'directional']
+
+class GhostOccupancyModel:
+    """
+    The transition model of RandomGhost or DirectionalGhost over a layout.
+
+    Only normal speed ghosts are modelled: scared ghosts cannot hurt Pacman,
+    so propagate leaves them out altogether.
+    """
+
+    def __init__(self, layout, ghostType='random', prob_attack=0.8):
+        if ghostType not in GHOST_MODELS:
+            raise Exception('Unknown ghost model ' + str(ghostType))
+        self.topology = topology.getTopology(layout)
+        self.ghostType = ghostType
+        self.prob_attack = prob_attack
+        self._moves = {}
+        self._transitions = {}
+
+    def getMoves(self, ghostState):
+        """
+        Returns the (action, nextCell) pairs open to a ghost in state
+        (cell, heading), following GhostRules.getLegalActions.
+        """
+        if ghostState not in self._moves:
+            cell, heading = ghostState
+            moves = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                nextCell = Actions.getSuccessor(cell, action)
+                if nextCell in self.topology.neighbors[cell]:
+                    moves.append((action, nextCell))
+            reverse = Actions.reverseDirection(heading)
+            if len(moves) > 1:
+                moves = [(action, nextCell) for action, nextCell in moves if action != reverse]
+            self._moves[ghostState] = moves
+        return self._moves[ghostState]
+
+    def getTransitions(self, ghostState, pacmanPos):
+        """
+        Returns a list of (nextGhostState, probability) pairs.  Random ghost
+        transitions do not depend on Pacman and are cached once per state.
+        """
+        key = ghostState
+        if self.ghostType == 'directional': key = (ghostState, pacmanPos)
+        if key not in self._transitions:
+            moves = self.getMoves(ghostState)
+            if len(moves) == 0:
+                self._transitions[key] = [(ghostState, 1.0)]
+                return self._transitions[key]
+            dist = util.Counter()
+            if self.ghostType == 'random':
+                for move in moves: dist[move] = 1.0
+            else:
+                distances = [manhattanDistance(nextCell, pacmanPos) for action, nextCell in moves]
+                bestScore = min(distances)
+                bestMoves = [move for move, distance in zip(moves, distances) if distance == bestScore]
+                for move in bestMoves: dist[move] = self.prob_attack / len(bestMoves)
+                for move in moves: dist[move] += (1 - self.prob_attack) / len(moves)
+            dist.normalize()
+            self._transitions[key] = [((nextCell, action), prob) for (action, nextCell), prob in dist.items()]
+        return self._transitions[key]
+
+    def step(self, distribution, pacmanPos):
+        """
+        Advances a Counter over ghost states by one move.
+        """
+        nextDistribution = util.Counter()
+        for ghostState, prob in distribution.items():
+            for nextState, transitionProb in self.getTransitions(ghostState, pacmanPos):
+                nextDistribution[nextState] += prob * transitionProb
+        return nextDistribution
+
+    def propagate(self, gameState, steps):
+        """
+        Returns a list of Counters, one for each of 0..steps ghost moves from
+        gameState, giving the probability that some non-scared ghost occupies
+        each cell.  Ghosts are assumed to move independently and, for the
+        directional model, towards Pacman's current position.
+        """
+        pacmanPos = gameState.getPacmanPosition()
+        distributions = []
+        for ghost in gameState.getGhostStates():
+            if ghost.scaredTimer > 0: continue
+            start = util.Counter()
+            start[(nearestPoint(ghost.getPosition()), ghost.getDirection())] = 1.0
+            distributions.append(start)
+
+        occupancy = []
+        for t in range(steps + 1):
+            free = {}
+            for distribution in distributions:
+                cells = util.Counter()
+                for (cell, heading), prob in distribution.items():
+                    cells[cell] += prob
+                for cell, prob in cells.items():
+                    free[cell] = free.get(cell, 1.0) * (1.0 - prob)
+            occupied = util.Counter()
+            for cell, prob in free.items():
+                occupied[cell] = 1.0 - prob
+            occupancy.append(occupied)
+            if t < steps:
+                distributions = [self.step(distribution, pacmanPos) for distribution in distributions]
+        return occupancy
+
+def getOccupancyModel(layout, ghostType='random'):
+    """
+    Returns the (cached) GhostOccupancyModel for a layout and ghost type.
+    """
+    key = ('\n'.join(layout.layoutText), ghostType)
+    if key not in OCCUPANCY_CACHE:
+        OCCUPANCY_CACHE[key] = GhostOccupancyModel(layout, ghostType)
+    return OCCUPANCY_CACHE[key]
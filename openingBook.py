@@ -0,0 +1,180 @@
+# openingBook.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Opening books: Pacman's first moves on a layout, searched offline.
+
+The builder starts from the initial GameState of a layout, asks a (deep,
+slow) search agent for its move, and follows the most likely ghost replies
+under a ghost model for a number of Pacman moves.  Every position it visits
+is stored with the move found, keyed by a 64 bit digest of the position.
+
+A book file is a header followed by the sorted keys and one byte per move.
+Books are small, so agents load them into a dictionary.  To build one:
+
+  python openingBook.py -l mediumClassic -p AlphaBetaAgent -a depth=4 --plies 4
+"""
+
+from game import Directions
+import hashlib, struct, sys
+
+MAGIC = 'PMOB'
+VERSION = 1
+HEADER = struct.Struct('<4sII20s')   # magic, version, numEntries, layout digest
+KEY = struct.Struct('<Q')
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+
+def layoutDigest(layout):
+    return hashlib.sha1('\n'.join(layout.layoutText)).digest()
+
+def positionKey(gameState):
+    """
+    A 64 bit digest of everything that decides the game from here on except
+    the score: agent configurations, scared timers, food and capsules.
+    """
+    agents = [(agentState.getPosition(), agentState.getDirection(), agentState.scaredTimer)
+              for agentState in gameState.data.agentStates]
+    position = (agents, gameState.getFood().packBits(), sorted(gameState.getCapsules()))
+    return KEY.unpack(hashlib.sha1(repr(position)).digest()[:KEY.size])[0]
+
+class OpeningBook:
+    """
+    A mapping from position keys to Pacman's book move for one layout.
+    """
+
+    def __init__(self, layout=None, moves=None):
+        self.digest = None
+        if layout is not None: self.digest = layoutDigest(layout)
+        self.moves = moves or {}
+
+    def matches(self, layout):
+        return self.digest == layoutDigest(layout)
+
+    def getMove(self, gameState):
+        return self.moves.get(positionKey(gameState))
+
+    def __len__(self):
+        return len(self.moves)
+
+    def write(self, path):
+        keys = sorted(self.moves.keys())
+        f = open(path, 'wb')
+        try:
+            f.write(HEADER.pack(MAGIC, VERSION, len(keys), self.digest))
+            for key in keys: f.write(KEY.pack(key))
+            f.write(''.join([chr(MOVES.index(self.moves[key])) for key in keys]))
+        finally:
+            f.close()
+
+def loadOpeningBook(path):
+    f = open(path, 'rb')
+    try: data = f.read()
+    finally: f.close()
+    magic, version, numEntries, digest = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise Exception('%s is not an opening book' % path)
+    book = OpeningBook()
+    book.digest = digest
+    movesOffset = HEADER.size + KEY.size * numEntries
+    for i in range(numEntries):
+        key = KEY.unpack_from(data, HEADER.size + KEY.size * i)[0]
+        book.moves[key] = MOVES[ord(data[movesOffset + i])]
+    return book
+
+def likelyReplies(state, ghosts, agentIndex=1, prob=1.0):
+    """
+    Returns (probability, state) pairs for every combination of ghost replies
+    to Pacman's last move, using the ghosts' own action distributions.
+    """
+    if state.isWin() or state.isLose() or agentIndex == state.getNumAgents():
+        return [(prob, state)]
+    replies = []
+    dist = ghosts[agentIndex - 1].getDistribution(state)
+    for action, actionProb in dist.items():
+        if actionProb <= 0: continue
+        replies += likelyReplies(state.generateSuccessor(agentIndex, action), ghosts,
+                                 agentIndex + 1, prob * actionProb)
+    return replies
+
+def buildOpeningBook(layout, pacman, ghosts, plies=4, maxReplies=3, verbose=True):
+    """
+    Searches every position within plies Pacman moves of the start of layout
+    along the maxReplies most likely ghost replies to each book move.
+    """
+    import pacman as pacmanModule
+    book = OpeningBook(layout)
+    start = pacmanModule.GameState()
+    start.initialize(layout, len(ghosts))
+    if 'registerInitialState' in dir(pacman):
+        pacman.registerInitialState(start.deepCopy())
+
+    frontier = [start]
+    for ply in range(plies):
+        nextFrontier = []
+        for state in frontier:
+            key = positionKey(state)
+            if key in book.moves: continue
+            action = pacman.getAction(state)
+            book.moves[key] = action
+            replies = likelyReplies(state.generateSuccessor(0, action), ghosts)
+            replies.sort(key=lambda reply: -reply[0])
+            for prob, nextState in replies[:maxReplies]:
+                if not nextState.isWin() and not nextState.isLose():
+                    nextFrontier.append(nextState)
+        frontier = nextFrontier
+        if verbose: print 'Ply %d: %d positions in book' % (ply + 1, len(book))
+    return book
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python openingBook.py <options>
+    EXAMPLES:   python openingBook.py -l mediumClassic -p AlphaBetaAgent -a depth=4
+                    - writes mediumClassic.book with 4-ply alpha-beta opening moves
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE to build a book for [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-p', '--pacman', dest='pacman', default='AlphaBetaAgent',
+                      help='the search agent TYPE that picks book moves [Default: %default]', metavar='TYPE')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default='depth=4',
+                      help='Comma separated values sent to agent [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='DirectionalGhost',
+                      help='the ghost agent TYPE whose likely replies are followed [Default: %default]')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('--plies', dest='plies', type='int', default=4,
+                      help='the number of Pacman moves covered by the book [Default: %default]')
+    parser.add_option('--maxReplies', dest='maxReplies', type='int', default=3,
+                      help='the number of ghost replies followed after each book move [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='the book file to write [Default: LAYOUT_FILE.book]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import layout, pacman
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    pacmanType = pacman.loadAgent(options.pacman, True)
+    agent = pacmanType(**pacman.parseAgentArgs(options.agentArgs))
+    ghostType = pacman.loadAgent(options.ghost, True)
+    ghosts = [ghostType(i + 1) for i in range(min(options.numGhosts, lay.getNumGhosts()))]
+    book = buildOpeningBook(lay, agent, ghosts, options.plies, options.maxReplies)
+    output = options.output or options.layout + '.book'
+    book.write(output)
+    print 'Wrote %d positions to %s' % (len(book), output)
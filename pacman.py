@@ -226,9 +226,13 @@ class GameState:
         else:
             self.data = GameStateData()
 
-    def deepCopy( self ):
+    def deepCopy( self, copyLayout=True ):
+        """
+        Nothing modifies a layout once a game starts, so copies made every
+        move can pass copyLayout=False and share it.
+        """
         state = GameState( self )
-        state.data = self.data.deepCopy()
+        state.data = self.data.deepCopy( copyLayout )
         return state
 
     def __eq__( self, other ):
@@ -243,6 +247,31 @@ class GameState:
         """
         return hash( self.data )
 
+    def encode( self ):
+        """
+        Returns a compact, canonical string key of the state (see
+        GameStateData.encode).  Equal states are exactly those with equal
+        keys, and GameState.decode turns a key back into a state.
+        """
+        return self.data.encode()
+
+    def decode( layout, key ):
+        state = GameState()
+        state.data.decode( layout, key )
+        return state
+    decode = staticmethod( decode )
+
+    def __getstate__( self ):
+        """
+        Pickles a state as its layout text and key.
+        """
+        return (tuple(self.data.layout.layoutText), self.encode())
+
+    def __setstate__( self, pickled ):
+        layoutText, key = pickled
+        self.data = GameStateData()
+        self.data.decode( cachedLayout(layoutText), key )
+
     def __str__( self ):
 
         return str(self.data)
@@ -253,6 +282,15 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+# Layouts of unpickled states, by their text
+_LAYOUTS = {}
+
+def cachedLayout( layoutText ):
+    if layoutText not in _LAYOUTS:
+        import layout
+        _LAYOUTS[layoutText] = layout.Layout(list(layoutText))
+    return _LAYOUTS[layoutText]
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -268,8 +306,10 @@ class ClassicGameRules:
     These game rules manage the control flow of a game, deciding when
     and how the game starts and ends.
     """
-    def __init__(self, timeout=30):
+    def __init__(self, timeout=30, moveTimeout=None, moveLimit=None):
         self.timeout = timeout
+        self.moveTimeout = moveTimeout
+        self.moveLimit = moveLimit
 
     def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
@@ -287,6 +327,19 @@ class ClassicGameRules:
         """
         if state.isWin(): self.win(state, game)
         if state.isLose(): self.lose(state, game)
+        if self.moveLimit != None and not game.gameOver:
+            reason = self.moveLimit.check(state, game)
+            if reason != None: self.adjudicate(state, game, reason)
+
+    def adjudicate( self, state, game, reason ):
+        """
+        Ends a game that ran too long or stalled, scoring it by the move
+        limit's policy.
+        """
+        self.moveLimit.adjudicate(state, game)
+        game.adjudicated = reason
+        if not self.quiet: print "Game adjudicated (%s) after %d Pacman moves! Score: %d" % (reason, self.moveLimit.getPacmanMoves(game), state.data.score)
+        game.gameOver = True
 
     def win( self, state, game ):
         if not self.quiet: print "Pacman emerges victorious! Score: %d" % state.data.score
@@ -315,11 +368,76 @@ class ClassicGameRules:
         return self.timeout
 
     def getMoveTimeout(self, agentIndex):
+        if self.moveTimeout != None: return self.moveTimeout
         return self.timeout
 
     def getMaxTimeWarnings(self, agentIndex):
         return 0
 
+class MoveLimit:
+    """
+    Bounds the length of games under ClassicGameRules.  A game is ended
+    once Pacman has made maxMoves moves, or once the board (see
+    GameStateData.boardKey) after one of Pacman's moves has been seen
+    stallRepeats times, and is then scored by adjudication:
+
+      score        the score as it stands, neither won nor lost
+      loss         a loss, with the penalty of being eaten
+      extrapolate  the score Pacman would finish with if it ate the food
+                   left at the rate it has eaten so far, win bonus
+                   included; as it stands if it has eaten nothing
+    """
+    POLICIES = ['score', 'loss', 'extrapolate']
+
+    def __init__( self, maxMoves=None, adjudication='score', stallRepeats=None ):
+        if adjudication not in MoveLimit.POLICIES:
+            raise Exception('Unknown adjudication policy ' + str(adjudication))
+        self.maxMoves = maxMoves
+        self.adjudication = adjudication
+        self.stallRepeats = stallRepeats
+
+    def settings( self ):
+        return (self.maxMoves, self.adjudication, self.stallRepeats)
+
+    def _counts( self, game ):
+        """
+        The game's count of Pacman moves and of each board seen after them.
+        They are kept on the game, so that games sharing these rules and
+        forks of a checkpoint each count their own.
+        """
+        if game.moveLimitCounts == None:
+            pacmanMoves = len([index for index, action in game.moveHistory if index == 0])
+            game.moveLimitCounts = {'pacmanMoves': pacmanMoves, 'boards': {}}
+        return game.moveLimitCounts
+
+    def getPacmanMoves( self, game ):
+        return self._counts(game)['pacmanMoves']
+
+    def check( self, state, game ):
+        """
+        Returns why game should be adjudicated after its last move, or None.
+        """
+        counts = self._counts(game)
+        if game.moveHistory[-1][0] != 0: return None
+        counts['pacmanMoves'] += 1
+        if self.stallRepeats != None:
+            key = state.data.boardKey()
+            count = counts['boards'].get(key, 0) + 1
+            counts['boards'][key] = count
+            if count >= self.stallRepeats: return 'stalled'
+        if self.maxMoves != None and counts['pacmanMoves'] >= self.maxMoves: return 'move limit'
+        return None
+
+    def adjudicate( self, state, game ):
+        if self.adjudication == 'loss':
+            state.data.score -= 500
+            state.data._lose = True
+        elif self.adjudication == 'extrapolate':
+            eaten = game.rules.initialState.getNumFood() - state.getNumFood()
+            if eaten > 0:
+                movesPerFood = self.getPacmanMoves(game) / float(eaten)
+                state.data.score += state.getNumFood() * (10 - movesPerFood * TIME_PENALTY) + 500
+
 class PacmanRules:
     """
     These functions govern how pacman interacts with his environment under
@@ -473,6 +591,15 @@ def parseAgentArgs(str):
         opts[key] = val
     return opts
 
+def parseAgentSpec( spec ):
+    """
+    Splits an agent given as TYPE or TYPE,opt1=val1,opt2=val2 into its type
+    name and agent options.
+    """
+    if ',' not in spec: return spec, {}
+    name, agentArgs = spec.split(',', 1)
+    return name, parseAgentArgs(agentArgs)
+
 def readCommand( argv ):
     """
     Processes the command used to run pacman from the command line.
@@ -510,9 +637,15 @@ def readCommand( argv ):
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
-                      help='Writes game histories to a file (named by the time they were played)', default=False)
+                      help='Appends game histories to a game log (see --recordFile)', default=False)
+    parser.add_option('--recordFile', dest='recordFile',
+                      help=default('The game log that -r appends to'), default='recorded-games.pmlog')
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A game log (or an old pickled game) to replay', default=None)
+    parser.add_option('--replayGame', dest='replayGame', type='int',
+                      help=default('The game of the log to replay, counting from 0'), default=0)
+    parser.add_option('--replayFrom', dest='replayFrom', type='int',
+                      help=default('The move of the game to start the replay at'), default=0)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -521,8 +654,36 @@ def readCommand( argv ):
                       help=default('Time to delay between frames; <0 means keyboard'), default=0.1)
     parser.add_option('-c', '--catchExceptions', action='store_true', dest='catchExceptions',
                       help='Turns on exception handling and timeouts during games', default=False)
-    parser.add_option('--timeout', dest='timeout', type='int',
+    parser.add_option('--timeout', dest='timeout', type='float',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--moveTimeout', dest='moveTimeout', type='float',
+                      help='Maximum length of time in seconds, like 0.05, an agent can spend on a single move (requires -c) [Default: --timeout]', default=None)
+    parser.add_option('--maxMoves', dest='maxMoves', type='int',
+                      help='End games after this many Pacman moves and adjudicate them (see --adjudicate)', default=None)
+    parser.add_option('--stallRepeats', dest='stallRepeats', type='int',
+                      help='End games whose board has repeated this many times and adjudicate them', default=None)
+    parser.add_option('--adjudicate', dest='adjudication', type='choice', choices=MoveLimit.POLICIES,
+                      help=default('How to score a game ended early: score, loss or extrapolate'), default='score')
+    parser.add_option('--metrics', dest='metrics',
+                      help='A file to write per-move latency histograms to, in the Prometheus text format', default=None)
+    parser.add_option('--metricsInterval', dest='metricsInterval', type='float',
+                      help=default('Seconds between rewrites of the --metrics file during a run'), default=10)
+    parser.add_option('--profile', dest='profile',
+                      help='Profile the run with cProfile, writing PREFIX.pstats and PREFIX.folded', metavar='PREFIX', default=None)
+    parser.add_option('--profileScope', dest='profileScope', type='choice', choices=['run', 'agents'],
+                      help=default('What --profile profiles: the whole run, or only the agents\' getAction calls'), default='run')
+    parser.add_option('--isolate', action='store_true', dest='isolate',
+                      help='Run the Pacman agent in a separate worker process', default=False)
+    parser.add_option('--agentMemory', dest='agentMemory', type='int',
+                      help='Memory limit in megabytes of an isolated agent (requires --isolate)', default=None)
+    parser.add_option('--workers', dest='workers', type='int',
+                      help=default('Number of processes to play games in (more than 1 requires -q)'), default=1)
+    parser.add_option('--seed', dest='seed', type='int',
+                      help='Master random seed; every game, and each agent in it, is seeded from it, so results do not depend on --workers', default=None)
+    parser.add_option('--stream', action='store_true', dest='stream',
+                      help='Keep only running totals of the games, so memory stays flat over long runs', default=False)
+    parser.add_option('--cache', dest='cache',
+                      help='A SQLite file of game results to reuse and add to (needs --seed)', default=None)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -543,7 +704,11 @@ def readCommand( argv ):
     if options.numTraining > 0:
         args['numTraining'] = options.numTraining
         if 'numTraining' not in agentOpts: agentOpts['numTraining'] = options.numTraining
-    pacman = pacmanType(**agentOpts) # Instantiate Pacman with agentArgs
+    if options.isolate:
+        import agentProcess
+        pacman = agentProcess.IsolatedAgent(pacmanType, agentOpts, 0, options.moveTimeout, options.agentMemory)
+    else:
+        pacman = pacmanType(**agentOpts) # Instantiate Pacman with agentArgs
     args['pacman'] = pacman
 
     # Don't display training games
@@ -567,12 +732,47 @@ def readCommand( argv ):
         import graphicsDisplay
         args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
     args['numGames'] = options.numGames
-    args['record'] = options.record
+    args['record'] = options.record and options.recordFile
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['moveTimeout'] = options.moveTimeout
+    args['workers'] = options.workers
+    args['seed'] = options.seed
+    args['stream'] = options.stream
+    if options.metrics:
+        import moveMetrics
+        args['metrics'] = moveMetrics.MoveMetrics(options.metrics, options.metricsInterval)
+    if options.maxMoves != None or options.stallRepeats != None:
+        args['moveLimit'] = MoveLimit(options.maxMoves, options.adjudication, options.stallRepeats)
+    if options.cache:
+        if options.seed == None: raise Exception('--cache needs a --seed')
+        if options.stream or options.numTraining > 0:
+            raise Exception('--cache cannot be combined with --stream or training games')
+        import resultCache
+        key = resultCache.runKey(args['layout'], pacmanType, agentOpts, ghostType, options.numGhosts,
+                                 options.timeout, options.moveTimeout, options.catchExceptions, args.get('moveLimit'))
+        args['cache'] = resultCache.ResultCache(options.cache, key)
+    if options.profile:
+        if options.workers > 1: raise Exception('Parallel games cannot be profiled')
+        args['profile'] = (options.profile, options.profileScope)
+    if options.workers > 1:
+        if not options.quietGraphics:
+            raise Exception('Playing games in parallel requires -q')
+        if options.numTraining > 0:
+            raise Exception('Training games cannot be played in parallel')
+        if options.isolate:
+            raise Exception('Isolated agents cannot be played in parallel')
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
+        import gameLog
+        if gameLog.isGameLog(options.gameToReplay):
+            print 'Replaying game %d of %s from move %d.' % (options.replayGame, options.gameToReplay, options.replayFrom)
+            log = gameLog.GameLogReader(options.gameToReplay)
+            state = log.stateAt(options.replayGame, options.replayFrom)
+            actions = log.getMoves(options.replayGame)[options.replayFrom:]
+            replayGame(log.getLayout(options.replayGame), actions, args['display'], state)
+            sys.exit(0)
         print 'Replaying recorded game %s.' % options.gameToReplay
         import cPickle
         f = open(options.gameToReplay)
@@ -585,6 +785,11 @@ def readCommand( argv ):
     return args
 
 def loadAgent(pacman, nographics):
+    # Agents hosted on an agent server are named remote:host:port:AgentName
+    if pacman.startswith('remote:'):
+        import remoteAgent
+        return remoteAgent.remoteAgentType(pacman)
+
     # Looks through all pythonPath Directories for the right module,
     pythonPathStr = os.path.expandvars("$PYTHONPATH")
     if pythonPathStr.find(';') == -1:
@@ -607,12 +812,15 @@ def loadAgent(pacman, nographics):
                 return getattr(module, pacman)
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
-def replayGame( layout, actions, display ):
+def replayGame( layout, actions, display, state=None ):
+    """
+    Shows actions being played on layout, from its start or from state.
+    """
     import pacmanAgents, ghostAgents
     rules = ClassicGameRules()
     agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(layout.getNumGhosts())]
     game = rules.newGame( layout, agents[0], agents[1:], display )
-    state = game.state
+    if state is None: state = game.state
     display.initialize(state.data)
 
     for action in actions:
@@ -625,46 +833,287 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+class GameResult:
+    """
+    The outcome of one game, small enough to send between processes.  It
+    offers the parts of a finished Game that callers of runGames use.
+    Without a game, the fields are left for the caller to fill in.
+    """
+    def __init__( self, game=None, seed=None, keepHistory=False ):
+        self.seed = seed
+        self.moveHistory = None
+        if game == None: return
+        self.score = game.state.getScore()
+        self.win = game.state.isWin()
+        self.lose = game.state.isLose()
+        self.numMoves = len(game.moveHistory)
+        self.agentTimeout = game.agentTimeout
+        self.agentCrashed = game.agentCrashed
+        self.totalAgentTimes = game.totalAgentTimes[:]
+        self.adjudicated = game.adjudicated
+        if keepHistory: self.moveHistory = game.moveHistory
+
+def deriveSeed( masterSeed, gameIndex ):
+    """
+    Returns the random seed of game gameIndex in a run seeded with masterSeed.
+    Seeds depend only on these two values, so a game plays out the same way
+    whichever process runs it.
+    """
+    import hashlib
+    digest = hashlib.sha1('%s:%d' % (masterSeed, gameIndex)).hexdigest()
+    return int(digest[:16], 16)
+
+def closeRemoteAgents( agents, closeConnections=True ):
+    """
+    Ends the server sessions of any remote agents (see remoteAgent) among
+    agents; no remote agent can exist unless that module is loaded.
+    """
+    if 'remoteAgent' in sys.modules:
+        sys.modules['remoteAgent'].closeRemoteAgents(agents, closeConnections)
+
+def openRecorder( record ):
+    """
+    Returns a writer for the game log named by record, or None when games
+    are not recorded.  record=True means the default log.
+    """
+    if not record: return None
+    import gameLog
+    if record is True: record = 'recorded-games.pmlog'
+    return gameLog.GameLogWriter(record)
+
+def printSummary( scores, wins ):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+class StreamSummary:
+    """
+    Running totals over GameResults, in constant memory.
+    """
+    def __init__( self ):
+        self.numGames = 0
+        self.totalScore = 0
+        self.wins = 0
+        self.totalMoves = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.adjudicated = 0
+
+    def add( self, result ):
+        self.numGames += 1
+        self.totalScore += result.score
+        self.wins += int(result.win)
+        self.totalMoves += result.numMoves
+        self.timeouts += int(result.agentTimeout)
+        self.crashes += int(result.agentCrashed)
+        self.adjudicated += int(result.adjudicated != None)
+
+    def printSummary( self ):
+        if self.numGames == 0: return
+        print 'Average Score:', self.totalScore / float(self.numGames)
+        print 'Win Rate:      %d/%d (%.2f)' % (self.wins, self.numGames, self.wins / float(self.numGames))
+        print 'Average Moves: %.1f' % (self.totalMoves / float(self.numGames))
+        print 'Timeouts:      %d   Crashes: %d   Adjudicated: %d' % (self.timeouts, self.crashes, self.adjudicated)
+
+def playGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, seed=None, moveTimeout=None, gameIndices=None, moveLimit=None, metrics=None ):
+    """
+    Plays numGames games one after another and yields each Game as it ends,
+    training games included.  gameIndices picks which games of the run to
+    play.
+    """
+    rules = ClassicGameRules(timeout, moveTimeout, moveLimit)
+    recorder = openRecorder(record)
+    if gameIndices is None: gameIndices = range( numGames )
+
+    try:
+        for i in gameIndices:
+            beQuiet = i < numTraining
+            if beQuiet:
+                    # Suppress output and graphics
+                import textDisplay
+                gameDisplay = textDisplay.NullGraphics()
+                rules.quiet = True
+            else:
+                gameDisplay = display
+                rules.quiet = False
+            if seed is not None: random.seed(deriveSeed(seed, i))
+            game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+            if seed is not None: game.randomStreams = deriveSeed(seed, i)
+            if recorder != None:
+                recorder.startGame(game.state)
+                game.recorder = recorder
+            game.metrics = metrics
+            game.run()
+            if metrics != None: metrics.endGame(game)
+
+            if recorder != None:
+                recorder.endGame(game.state)
+            yield game
+    finally:
+        if recorder != None: recorder.close()
+        if metrics != None: metrics.export()
+        closeRemoteAgents([pacman] + list(ghosts))
+
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=1, seed=None, moveTimeout=None, stream=False, cache=None, moveLimit=None, metrics=None ):
+    """
+    Plays numGames games and prints their statistics.  With a seed, each
+    game is seeded from it and every agent draws from its own random stream
+    (see Game.seedAgent), so agents compared on one seed face the same
+    ghosts for as long as they can.  With more than one
+    worker the games are played headless in a process pool and GameResults
+    are returned instead of Games.  With stream, see streamGames; with a
+    resultCache.ResultCache, see runCachedGames.  A MoveLimit bounds
+    the length of every game, and a moveMetrics.MoveMetrics times
+    every move.
+    """
     import __main__
     __main__.__dict__['_display'] = display
 
-    rules = ClassicGameRules(timeout)
-    games = []
+    if cache != None:
+        return runCachedGames( layout, pacman, ghosts, display, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, cache, moveLimit, metrics )
 
-    for i in range( numGames ):
-        beQuiet = i < numTraining
-        if beQuiet:
-                # Suppress output and graphics
-            import textDisplay
-            gameDisplay = textDisplay.NullGraphics()
-            rules.quiet = True
-        else:
-            gameDisplay = display
-            rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
-        game.run()
-        if not beQuiet: games.append(game)
+    if stream:
+        return streamGames( layout, pacman, ghosts, display, numGames, record, numTraining, catchExceptions, timeout, workers, seed, moveTimeout, moveLimit, metrics )
+
+    if workers > 1:
+        return runParallelGames( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, moveLimit, metrics )
 
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+    games = []
+    for i, game in enumerate(playGames( layout, pacman, ghosts, display, numGames, record, numTraining, catchExceptions, timeout, seed, moveTimeout, None, moveLimit, metrics )):
+        if i >= numTraining: games.append(game)
 
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary(scores, wins)
 
     return games
 
+def runCachedGames( layout, pacman, ghosts, display, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, cache, moveLimit=None, metrics=None ):
+    """
+    Plays the games of a seeded run that cache has no results for, stores
+    their results, and returns the GameResults of all numGames games.
+    """
+    import itertools
+    if seed is None: raise Exception('Only runs with a --seed can be cached')
+    results = cache.lookup(seed, range(numGames))
+    missing = [i for i in range(numGames) if i not in results]
+    print 'Found %d of %d games in %s' % (len(results), numGames, cache.path)
+    if workers > 1:
+        played = parallelResults( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, missing, moveLimit, metrics )
+    else:
+        games = playGames( layout, pacman, ghosts, display, numGames, record, 0, catchExceptions, timeout, seed, moveTimeout, missing, moveLimit, metrics )
+        played = (GameResult(game, deriveSeed(seed, i)) for i, game in itertools.izip(missing, games))
+    try:
+        for i, result in itertools.izip(missing, played):
+            cache.store(seed, i, result)
+            cache.commit()
+            results[i] = result
+    finally:
+        cache.close()
+
+    results = [results[i] for i in range(numGames)]
+    if numGames > 0:
+        printSummary([result.score for result in results], [result.win for result in results])
+    return results
+
+def streamGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, workers=1, seed=None, moveTimeout=None, moveLimit=None, metrics=None ):
+    """
+    Plays games like runGames, but yields a GameResult for every game past
+    the training ones as it ends and keeps nothing else of it: the Game is
+    dropped, GameState.explored is emptied after every game and only
+    running totals are printed once the stream is exhausted.  Memory stays
+    flat however many games are played.
+    """
+    if workers > 1:
+        results = parallelResults( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, None, moveLimit, metrics )
+    else:
+        games = playGames( layout, pacman, ghosts, display, numGames, record, numTraining, catchExceptions, timeout, seed, moveTimeout, None, moveLimit, metrics )
+        results = (GameResult(game) for game in games)
+    summary = StreamSummary()
+    for i, result in enumerate(results):
+        GameState.explored.clear()
+        if i < numTraining: continue
+        result.moveHistory = None
+        summary.add(result)
+        yield result
+    summary.printSummary()
+
+# Per-process game setup of a parallel run, set once by _initWorker
+_WORKER = None
+
+def _initWorker( layout, pacman, ghosts, catchExceptions, timeout, moveTimeout, moveLimit=None, timeMoves=False ):
+    global _WORKER
+    import textDisplay
+    rules = ClassicGameRules(timeout, moveTimeout, moveLimit)
+    _WORKER = (layout, pacman, ghosts, catchExceptions, rules, textDisplay.NullGraphics(), timeMoves)
+
+def _runWorkerGame( job ):
+    gameIndex, gameSeed, keepHistory = job
+    layout, pacman, ghosts, catchExceptions, rules, display, timeMoves = _WORKER
+    random.seed(gameSeed)
+    game = rules.newGame( layout, pacman, ghosts, display, True, catchExceptions )
+    game.randomStreams = gameSeed
+    if timeMoves:
+        import moveMetrics
+        game.metrics = moveMetrics.MoveMetrics()
+    try:
+        game.run()
+    finally:
+        # A worker is not told when the run ends, so sessions end with each game
+        closeRemoteAgents(game.agents, False)
+    result = GameResult(game, gameSeed, keepHistory)
+    if timeMoves:
+        game.metrics.endGame(game)
+        result.metrics = game.metrics
+    return result
+
+def runParallelGames( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout=None, moveLimit=None, metrics=None ):
+    """
+    Shards games over a pool of worker processes (see parallelResults) and
+    returns their GameResults.
+    """
+    results = list(parallelResults( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout, None, moveLimit, metrics ))
+    if numGames > 0:
+        printSummary([result.score for result in results], [result.win for result in results])
+    return results
+
+def parallelResults( layout, pacman, ghosts, numGames, record, catchExceptions, timeout, workers, seed, moveTimeout=None, gameIndices=None, moveLimit=None, metrics=None ):
+    """
+    Plays games (those in gameIndices, if given) in a pool of worker
+    processes and yields their GameResults.
+    The layout and agents are sent to each worker once, when it starts;
+    each game then only costs its index and seed on the way out and a
+    GameResult on the way back.  Results come back in game order, so the
+    output does not depend on the number of workers.
+    """
+    import multiprocessing
+    if seed is None: seed = random.getrandbits(64)
+    if gameIndices is None: gameIndices = range(numGames)
+    jobs = [(i, deriveSeed(seed, i), bool(record)) for i in gameIndices]
+    pool = multiprocessing.Pool(workers, _initWorker, (layout, pacman, ghosts, catchExceptions, timeout, moveTimeout, moveLimit, metrics != None))
+    recorder = openRecorder(record)
+    numAgents = min(len(ghosts), layout.getNumGhosts()) + 1
+    try:
+        for result in pool.imap(_runWorkerGame, jobs):
+            if result.win: print "Pacman emerges victorious! Score: %d" % result.score
+            elif result.lose: print "Pacman died! Score: %d" % result.score
+            elif result.adjudicated: print "Game adjudicated (%s)! Score: %d" % (result.adjudicated, result.score)
+            if recorder != None:
+                recorder.writeGame(layout, result.moveHistory, numAgents, (result.score, result.win, result.lose))
+            if metrics != None:
+                metrics.merge(result.metrics)
+                result.metrics = None
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        if recorder != None: recorder.close()
+        if metrics != None: metrics.export()
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -677,8 +1126,11 @@ if __name__ == '__main__':
     > python pacman.py --help
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
-    runGames( **args )
-
-    # import cProfile
-    # cProfile.run("runGames( **args )")
-    pass
+    profile = args.pop('profile', None)
+    if profile != None:
+        import profiling
+        profiling.profileRun( runGames, args, *profile )
+        sys.exit(0)
+    games = runGames( **args )
+    if args['stream']:
+        for result in games: pass
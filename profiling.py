@@ -0,0 +1,181 @@
+# profiling.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Profiling runs of pacman.py with cProfile.
+
+  python pacman.py -q -p AlphaBetaAgent -a depth=3 -n 5 --profile ab3 --profileScope agents
+
+profiles the agents' getAction calls only (or, with --profileScope run,
+everything) and writes
+
+  ab3.pstats   the profile, for pstats, snakeviz and the like
+  ab3.folded   collapsed stacks ("caller;callee microseconds" lines) for
+               flamegraph.pl or speedscope
+
+then prints the time spent in the game rules, evaluation functions, the
+display and agents' getAction, and the functions with the most time of
+their own.  cProfile records who called whom but not whole stacks, so the
+stacks are rebuilt from the call graph, splitting a function's time among
+its callers by how much of it each one caused.
+"""
+
+import cProfile
+import os
+import pstats
+import types
+
+# (module file, function) pairs that make up the rules of the game
+RULES_FUNCTIONS = set([
+    ('pacman.py', 'getLegalActions'), ('pacman.py', 'generateSuccessor'),
+    ('pacman.py', 'getLegalPacmanActions'), ('pacman.py', 'generatePacmanSuccessor'),
+    ('pacman.py', 'applyAction'), ('pacman.py', 'consume'), ('pacman.py', 'decrementTimer'),
+    ('pacman.py', 'checkDeath'), ('pacman.py', 'collide'), ('pacman.py', 'canKill'),
+    ('pacman.py', 'placeGhost'), ('pacman.py', 'process'),
+    ('game.py', 'generateSuccessor'), ('game.py', 'getPossibleActions'), ('game.py', 'getLegalNeighbors')])
+
+DISPLAY_MODULES = ['graphicsDisplay.py', 'graphicsUtils.py', 'textDisplay.py']
+
+def category(function):
+    """
+    Returns the part of the game a pstats function key (file, line, name)
+    belongs to, or None.
+    """
+    filename, line, name = function
+    module = os.path.basename(filename)
+    if (module, name) in RULES_FUNCTIONS: return 'rules'
+    if 'valuation' in name: return 'evaluation'
+    if module in DISPLAY_MODULES: return 'display'
+    if name == 'getAction': return 'getAction'
+    return None
+
+def profilerCall(function):
+    """
+    Whether a pstats function key is the profiler's own enable or disable,
+    which profileAgents' wrapper is caught calling.
+    """
+    filename, line, name = function
+    return filename == '~' and '_lsprof.Profiler' in name
+
+def functionLabel(function):
+    filename, line, name = function
+    if filename == '~': return name
+    return '%s (%s:%d)' % (name, os.path.basename(filename), line)
+
+def attribute(stats):
+    """
+    Returns the seconds spent in each category, counting a call into it
+    from outside it with everything it calls, and the total seconds.
+    """
+    times = {}
+    for function, (cc, nc, tt, ct, callers) in stats.stats.items():
+        group = category(function)
+        if group == None: continue
+        entered = ct
+        if callers:
+            entered = sum([edge[3] for caller, edge in callers.items() if category(caller) != group])
+        times[group] = times.get(group, 0) + entered
+    return times, stats.total_tt
+
+def collapsedStacks(stats, minimum=1e-6):
+    """
+    Returns the profile as collapsed stacks: a count of microseconds for
+    each stack of function labels.  A function reached along an edge that
+    caused a share of its cumulative time gets that share of its own time
+    and of every edge out of it.  Recursion is cut at the first repeat and
+    stacks under minimum seconds are dropped, and so are the profiler's
+    own calls.
+    """
+    callees = {}
+    for function, (cc, nc, tt, ct, callers) in stats.stats.items():
+        if profilerCall(function): continue
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((function, edge[3]))
+    roots = [function for function, value in stats.stats.items()
+             if not profilerCall(function) and not [caller for caller in value[4] if caller != function]]
+
+    stacks = {}
+    def visit(function, seconds, stack, onStack):
+        cc, nc, tt, ct, callers = stats.stats[function]
+        share = 1.0
+        if ct > 0: share = min(seconds / ct, 1.0)
+        stack = stack + [functionLabel(function)]
+        own = tt * share
+        if own >= minimum:
+            key = ';'.join(stack)
+            stacks[key] = stacks.get(key, 0) + own
+        onStack.add(function)
+        for callee, edgeSeconds in callees.get(function, []):
+            if callee in onStack or edgeSeconds * share < minimum: continue
+            visit(callee, edgeSeconds * share, stack, onStack)
+        onStack.discard(function)
+
+    for root in roots:
+        visit(root, stats.stats[root][3], [], set())
+    return dict([(key, int(round(seconds * 1e6))) for key, seconds in stacks.items()])
+
+def writeCollapsed(stats, path):
+    f = open(path, 'w')
+    try:
+        for key, micros in sorted(collapsedStacks(stats).items()):
+            if micros > 0: f.write('%s %d\n' % (key, micros))
+    finally:
+        f.close()
+
+def profileAgents(profiler, agents):
+    """
+    Turns profiler on for the getAction calls of agents only.
+    """
+    def profiled(getAction):
+        def call(*args, **kwargs):
+            profiler.enable()
+            try: return getAction(*args, **kwargs)
+            finally: profiler.disable()
+        return call
+    for agent in agents:
+        agent.getAction = profiled(agent.getAction)
+
+def printReport(stats, prefix, top=15):
+    times, total = attribute(stats)
+    print
+    print 'Profile written to %s.pstats and %s.folded (%.2fs profiled)' % (prefix, prefix, total)
+    print '%-12s %10s %7s' % ('Part', 'Seconds', 'Share')
+    for group in ['getAction', 'evaluation', 'rules', 'display']:
+        seconds = times.get(group, 0)
+        print '%-12s %10.3f %6.1f%%' % (group, seconds, 100.0 * seconds / max(total, 1e-9))
+    print
+    stats.sort_stats('tottime').print_stats(top)
+
+def profileRun(runGames, args, prefix, scope='run'):
+    """
+    Plays runGames(**args) under cProfile, profiling everything (scope
+    'run') or only the agents' getAction calls (scope 'agents'), writes
+    prefix.pstats and prefix.folded and prints a report.
+    """
+    profiler = cProfile.Profile()
+    if scope == 'agents':
+        profileAgents(profiler, [args['pacman']] + list(args['ghosts']))
+    else:
+        profiler.enable()
+    try:
+        games = runGames(**args)
+        if isinstance(games, types.GeneratorType):
+            for result in games: pass
+    finally:
+        profiler.disable()
+    profiler.dump_stats(prefix + '.pstats')
+    stats = pstats.Stats(prefix + '.pstats')
+    writeCollapsed(stats, prefix + '.folded')
+    printReport(stats, prefix)
+    return games
@@ -0,0 +1,467 @@
+# remoteAgent.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Agents hosted on other machines, spoken to over TCP.
+
+An agent server hosts any agent that pacman.loadAgent can find.  Games reach
+it through RemoteAgent, which pacman.loadAgent returns for specs of the form
+remote:host:port:AgentName, so
+
+  python remoteAgent.py --host 0.0.0.0 --port 5555              (server)
+  python pacman.py -q -n 10 -p remote:bigbox:5555:AlphaBetaAgent -a depth=4
+
+plays ten games locally with Pacman's moves searched on bigbox.
+
+Every frame is a 4 byte length followed by a marshalled batch of requests
+(session, kind, payload), answered by a frame with one ('ok', value) or
+('error', traceback) reply per request.  A session is one agent on the
+server; it gets the layout and its state as a delta from the layout's
+initial state in 'register', then the agentProcess deltas since its last
+look in 'action' and 'final'.  final is sent as soon as a game ends, so the
+server's agent sees the end of the last game too, and runGames closes the
+sessions of remote agents when its games are done.  Connections are
+persistent and pooled per server.  A request that misses its deadline raises
+TimeoutFunctionException and its connection is dropped.
+
+Frames are marshalled, never pickled, so a server runs no code sent by
+clients -- but it does run any agent a client names, so it listens on
+127.0.0.1 unless told otherwise, and should only be exposed to machines
+you trust.
+"""
+
+from game import Agent
+from agentProcess import stateDelta, applyDelta
+from util import TimeoutFunctionException
+import SocketServer
+import errno
+import marshal
+import os
+import random
+import socket
+import struct
+import sys
+import threading
+import traceback
+import util
+
+FRAME_HEADER = struct.Struct('!I')
+MARSHAL_VERSION = 2
+
+#############
+# Transport #
+#############
+
+def recvExactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk: raise EOFError('Connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+def writeFrame(sock, value):
+    data = marshal.dumps(value, MARSHAL_VERSION)
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+def readFrame(sock):
+    size = FRAME_HEADER.unpack(recvExactly(sock, FRAME_HEADER.size))[0]
+    return marshal.loads(recvExactly(sock, size))
+
+class FrameBuffer:
+    """
+    The bytes read so far from a non-blocking socket, for event loops that
+    must not wait on a peer that sent half a frame.
+    """
+
+    def __init__(self):
+        self.data = ''
+
+    def readFrom(self, sock):
+        """
+        Reads what sock has ready and returns the next whole frame, or None
+        until one has arrived.
+        """
+        try:
+            chunk = sock.recv(65536)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR): return None
+            raise
+        if not chunk: raise EOFError('Connection closed')
+        self.data += chunk
+        if len(self.data) < FRAME_HEADER.size: return None
+        size = FRAME_HEADER.unpack_from(self.data)[0]
+        end = FRAME_HEADER.size + size
+        if len(self.data) < end: return None
+        frame = marshal.loads(self.data[FRAME_HEADER.size:end])
+        self.data = self.data[end:]
+        return frame
+
+class ConnectionPool:
+    """
+    Idle connections to agent servers, kept open between requests.
+    """
+
+    def __init__(self):
+        self.idle = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, address):
+        self.lock.acquire()
+        try:
+            connections = self.idle.get(address)
+            if connections: return connections.pop()
+        finally:
+            self.lock.release()
+        conn = socket.create_connection(address)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return conn
+
+    def release(self, address, conn):
+        self.lock.acquire()
+        try:
+            self.idle.setdefault(address, []).append(conn)
+        finally:
+            self.lock.release()
+
+    def closeAll(self):
+        self.lock.acquire()
+        try:
+            for connections in self.idle.values():
+                for conn in connections: conn.close()
+            self.idle = {}
+        finally:
+            self.lock.release()
+
+POOL = ConnectionPool()
+
+##########
+# Client #
+##########
+
+def initialState(state):
+    """
+    The state a layout starts in, which register deltas are taken from.
+    """
+    start = state.__class__()
+    start.initialize(state.data.layout, state.getNumAgents() - 1)
+    return start
+
+class RemoteAgent(Agent):
+    """
+    An agent of type agentName, built from agentArgs on the agent server at
+    host:port.  timeout bounds every request in seconds; when the call runs
+    under a util deadline, the tighter one applies.
+
+    A session is named when it is opened, by the process that opens it, and
+    copies of the agent (pickled into --workers processes, or deep copied)
+    start without one, so no two games ever drive the same session.
+    """
+
+    def __init__(self, host, port, agentName, index=0, agentArgs=None, timeout=None):
+        Agent.__init__(self, index)
+        self.address = (host, int(port))
+        self.agentName = agentName
+        self.agentArgs = agentArgs or {}
+        self.timeout = timeout
+        self.session = None
+        self.pending = []
+        self.opened = False
+        self.lastState = None
+
+    def __getstate__(self):
+        copied = self.__dict__.copy()
+        copied.update(session=None, pending=[], opened=False, lastState=None)
+        return copied
+
+    def getTimeout(self):
+        limits = [limit for limit in [self.timeout, util.timeRemaining()] if limit != None]
+        if len(limits) == 0: return None
+        return max(1e-6, min(limits))
+
+    def exchange(self, batch):
+        conn = POOL.acquire(self.address)
+        try:
+            conn.settimeout(self.getTimeout())
+            writeFrame(conn, batch)
+            replies = readFrame(conn)
+        except socket.timeout:
+            conn.close()
+            raise TimeoutFunctionException()
+        except (socket.error, EOFError), e:
+            conn.close()
+            raise Exception('Lost the connection to %s:%d: %s' % (self.address + (e,)))
+        except:
+            conn.close()
+            raise
+        POOL.release(self.address, conn)
+        return replies
+
+    def makeBatch(self, kind, payload):
+        batch = self.pending + [(self.session, kind, payload)]
+        self.pending = []
+        return batch
+
+    def checkReplies(self, replies):
+        for status, value in replies:
+            if status == 'error':
+                raise Exception('%s on %s:%d raised:\n%s' % ((self.agentName,) + self.address + (value,)))
+        return replies[-1][1]
+
+    def request(self, kind, payload):
+        """
+        Sends kind, along with any queued requests, and returns its reply.
+        """
+        return self.checkReplies(self.exchange(self.makeBatch(kind, payload)))
+
+    def registerInitialState(self, state):
+        if not self.opened:
+            # os.urandom, not random: worker processes seed random alike
+            self.session = os.urandom(8).encode('hex')
+            self.pending.append((self.session, 'open', (self.agentName, self.index, self.agentArgs)))
+            self.opened = True
+        delta = stateDelta(initialState(state), state)
+        layoutText = state.data.layout.layoutText
+        self.request('register', (layoutText, state.getNumAgents(), delta, hash(random.getstate())))
+        self.lastState = state
+
+    def getAction(self, state):
+        if self.lastState == None:
+            raise Exception('%s has no game in progress on %s:%d' % ((self.agentName,) + self.address))
+        delta = stateDelta(self.lastState, state)
+        self.lastState = state
+        return self.request('action', delta)
+
+    def getActionAsync(self, state, loop):
+        """
+        getAction for a gameServer event loop: sends the request and returns
+        a Future for the reply without waiting for it.
+        """
+        import gameServer
+        if self.lastState == None:
+            raise Exception('%s has no game in progress on %s:%d' % ((self.agentName,) + self.address))
+        batch = self.makeBatch('action', stateDelta(self.lastState, state))
+        self.lastState = state
+        conn = POOL.acquire(self.address)
+        conn.settimeout(None)
+        writeFrame(conn, batch)
+        conn.setblocking(0)
+        future = gameServer.Future()
+        reply = FrameBuffer()
+
+        def onReadable():
+            try:
+                replies = reply.readFrom(conn)
+            except (socket.error, EOFError), e:
+                loop.removeReader(conn)
+                conn.close()
+                future.setException(Exception('Lost the connection to %s:%d: %s' % (self.address + (e,))))
+                return
+            if replies == None: return
+            loop.removeReader(conn)
+            conn.setblocking(1)
+            POOL.release(self.address, conn)
+            try:
+                future.setResult(self.checkReplies(replies))
+            except Exception, e:
+                future.setException(e)
+
+        def onCancel():
+            loop.removeReader(conn)
+            conn.close()
+
+        loop.addReader(conn, onReadable)
+        future.onCancel(onCancel)
+        return future
+
+    def final(self, state):
+        if self.lastState == None: return
+        delta = stateDelta(self.lastState, state)
+        self.lastState = None
+        self.request('final', delta)
+
+    def close(self):
+        """
+        Flushes queued requests and ends the session on the server.
+        """
+        opened = self.opened
+        self.opened = False
+        self.lastState = None
+        if opened: self.request('close', None)
+
+def closeRemoteAgents(agents, closeConnections=True):
+    """
+    Ends the server sessions of the remote agents among agents and, with
+    closeConnections, closes the pooled connections.  A server that cannot
+    be reached is reported, not raised, since this runs on the way out.
+    """
+    for agent in agents:
+        if not isinstance(agent, RemoteAgent): continue
+        try:
+            agent.close()
+        except Exception, e:
+            print >>sys.stderr, 'Could not close %s on %s:%d: %s' % ((agent.agentName,) + agent.address + (e,))
+    if closeConnections: POOL.closeAll()
+
+def remoteAgentType(spec):
+    """
+    Returns a constructor for the agent named by remote:host:port:AgentName,
+    called like the agent class itself.
+    """
+    try:
+        prefix, host, port, agentName = spec.split(':')
+        port = int(port)
+    except ValueError:
+        raise Exception('Remote agents are specified as remote:host:port:AgentName, not ' + spec)
+    def makeAgent(index=0, **agentArgs):
+        return RemoteAgent(host, port, agentName, index, agentArgs)
+    makeAgent.__name__ = agentName
+    return makeAgent
+
+##########
+# Server #
+##########
+
+class AgentSession:
+    def __init__(self, agent):
+        self.agent = agent
+        self.state = None
+        self.lock = threading.Lock()
+
+class AgentRequestHandler(SocketServer.BaseRequestHandler):
+    """
+    Serves the batches of one persistent connection.
+    """
+
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                batch = readFrame(self.request)
+            except (EOFError, socket.error):
+                return
+            replies = [self.server.serve(session, kind, payload) for session, kind, payload in batch]
+            try:
+                writeFrame(self.request, replies)
+            except socket.error:
+                return
+
+class AgentServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """
+    Hosts agent sessions for any number of connections, one thread each.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address):
+        SocketServer.TCPServer.__init__(self, address, AgentRequestHandler)
+        self.sessions = {}
+        self.layouts = {}
+        self.lock = threading.Lock()
+
+    def getLayout(self, layoutText):
+        import layout
+        key = '\n'.join(layoutText)
+        if key not in self.layouts: self.layouts[key] = layout.Layout(list(layoutText))
+        return self.layouts[key]
+
+    def openSession(self, sessionId, agentName, index, agentArgs):
+        import pacman
+        agentType = pacman.loadAgent(agentName, True)
+        if index == 0: agent = agentType(**agentArgs)
+        else: agent = agentType(index, **agentArgs)
+        self.lock.acquire()
+        try: self.sessions[sessionId] = AgentSession(agent)
+        finally: self.lock.release()
+
+    def serve(self, sessionId, kind, payload):
+        try:
+            if kind == 'open':
+                self.openSession(sessionId, *payload)
+                return ('ok', None)
+            if sessionId not in self.sessions:
+                raise Exception('Unknown session ' + sessionId)
+            session = self.sessions[sessionId]
+            session.lock.acquire()
+            try:
+                value = self.serveSession(session, kind, payload)
+            finally:
+                session.lock.release()
+            if kind == 'close':
+                self.lock.acquire()
+                try: del self.sessions[sessionId]
+                finally: self.lock.release()
+            return ('ok', value)
+        except Exception:
+            return ('error', traceback.format_exc())
+
+    def serveSession(self, session, kind, payload):
+        import pacman
+        agent = session.agent
+        if kind == 'register':
+            layoutText, numAgents, delta, seed = payload
+            start = pacman.GameState()
+            start.initialize(self.getLayout(layoutText), numAgents - 1)
+            session.state = applyDelta(start, delta)
+            random.seed(seed)
+            if 'registerInitialState' in dir(agent):
+                agent.registerInitialState(session.state.deepCopy())
+        elif kind == 'action':
+            session.state = applyDelta(session.state, payload)
+            return agent.getAction(session.state.deepCopy(False))
+        elif kind == 'final':
+            session.state = applyDelta(session.state, payload)
+            if 'final' in dir(agent): agent.final(session.state)
+        elif kind != 'close':
+            raise Exception('Unknown request ' + str(kind))
+        return None
+
+def startLocalServer(host='localhost', port=0):
+    """
+    Starts an agent server on a daemon thread of this process and returns
+    it; server.server_address is where it listens.  A stand-in for a real
+    server in tests.
+    """
+    server = AgentServer((host, port))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python remoteAgent.py <options>
+    EXAMPLES:   python remoteAgent.py --port 5555
+                    - hosts agents for remote:thishost:5555:AgentName specs
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('--host', dest='host', default='127.0.0.1',
+                      help='the address to listen on; 0.0.0.0 serves other machines [Default: %default]')
+    parser.add_option('--port', dest='port', type='int', default=5555,
+                      help='the port to listen on [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    server = AgentServer((options.host, options.port))
+    print 'Serving agents on %s:%d' % server.server_address
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,138 @@
+# resultCache.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A SQLite store of game results, keyed by everything that decides a game.
+
+A seeded game is a function of the layout, the agents' code and arguments,
+the ghosts, the time limits, the master seed and its index in the run.  The
+run key hashes all but the last two, with the source of the agents' and the
+game engine's modules standing in for their code, and each game is stored
+under the run key, seed and index.  Rerunning a configuration plays only
+the games it has not played before:
+
+  python pacman.py -q -p AlphaBetaAgent -a depth=3 -n 200 --seed 1 --cache results.db
+
+Only what an agent's own module contains is hashed, so edits to other
+modules it imports go unnoticed, and agents that learn across games should
+not be cached.
+
+Results are stored as plain columns, with the move history (when kept)
+and agent times marshalled, rather than as pickles: a GameResult pickled
+by pacman.py run as a script would name __main__.GameResult, which no
+other entry point could load.
+"""
+
+import hashlib
+import inspect
+import marshal
+import os
+import sqlite3
+import sys
+
+ENGINE_MODULES = ['pacman', 'game', 'layout', 'util']
+
+def sourceHash(obj):
+    """
+    Returns the SHA-1 of the source file of the module defining obj (an
+    agent class or a module).
+    """
+    path = None
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:
+        pass
+    if path == None or not os.path.exists(path): return None
+    f = open(path, 'rb')
+    try: return hashlib.sha1(f.read()).hexdigest()
+    finally: f.close()
+
+def agentName(agentType):
+    return getattr(agentType, '__name__', str(agentType))
+
+def runKey(layout, pacmanType, agentArgs, ghostType, numGhosts, timeout=30, moveTimeout=None, catchExceptions=False,
+           moveLimit=None):
+    """
+    Returns the key of a run's configuration: its layout, Pacman type,
+    arguments and source, ghost type and source, time and move limits and
+    the engine's source.
+    """
+    engine = [(name, sourceHash(sys.modules.get(name) or __import__(name))) for name in ENGINE_MODULES]
+    config = ('\n'.join(layout.layoutText),
+              agentName(pacmanType), sourceHash(pacmanType), sorted((agentArgs or {}).items()),
+              agentName(ghostType), sourceHash(ghostType), min(numGhosts, layout.getNumGhosts()),
+              timeout, moveTimeout, catchExceptions, engine)
+    if moveLimit != None: config += (moveLimit.settings(),)
+    return hashlib.sha1(repr(config)).hexdigest()
+
+class ResultCache:
+    """
+    The GameResults of one run configuration, stored in the SQLite
+    database at path.
+    """
+
+    def __init__(self, path, key):
+        self.path = path
+        self.key = key
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS gameResults ('
+                        'run TEXT, seed TEXT, game INTEGER, gameSeed TEXT, score REAL, win INTEGER, lose INTEGER, '
+                        'crashed INTEGER, timedOut INTEGER, adjudicated TEXT, numMoves INTEGER, '
+                        'agentTimes BLOB, history BLOB, PRIMARY KEY (run, seed, game))')
+        self.db.commit()
+
+    def lookup(self, seed, gameIndices):
+        """
+        Returns the stored GameResults of the run's games in gameIndices, by
+        index.
+        """
+        import pacman
+        results = {}
+        rows = self.db.execute('SELECT game, gameSeed, score, win, lose, crashed, timedOut, adjudicated, numMoves, '
+                               'agentTimes, history FROM gameResults WHERE run = ? AND seed = ?',
+                               (self.key, str(seed)))
+        wanted = set(gameIndices)
+        for row in rows:
+            gameIndex, gameSeed, score, win, lose, crashed, timedOut, adjudicated, numMoves, agentTimes, history = row
+            if gameIndex not in wanted: continue
+            result = pacman.GameResult()
+            if score == int(score): score = int(score)
+            result.score = score
+            result.win = bool(win)
+            result.lose = bool(lose)
+            result.agentCrashed = bool(crashed)
+            result.agentTimeout = bool(timedOut)
+            result.adjudicated = adjudicated
+            result.numMoves = numMoves
+            result.totalAgentTimes = marshal.loads(str(agentTimes))
+            if gameSeed != None: result.seed = long(gameSeed)
+            if history != None: result.moveHistory = marshal.loads(str(history))
+            results[gameIndex] = result
+        return results
+
+    def store(self, seed, gameIndex, result):
+        gameSeed = history = None
+        if result.seed != None: gameSeed = str(result.seed)
+        if result.moveHistory != None: history = sqlite3.Binary(marshal.dumps(list(result.moveHistory)))
+        self.db.execute('INSERT OR REPLACE INTO gameResults VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        (self.key, str(seed), gameIndex, gameSeed, result.score, int(result.win), int(result.lose),
+                         int(result.agentCrashed), int(result.agentTimeout), result.adjudicated, result.numMoves,
+                         sqlite3.Binary(marshal.dumps(list(result.totalAgentTimes))), history))
+
+    def commit(self):
+        self.db.commit()
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,391 @@
+# rollouts.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A NumPy reimplementation of the classic rules for mass random playouts.
+
+RolloutEngine plays thousands of games at once with the rules of PacmanRules
+and GhostRules in pacman.py, but keeps every game in flat arrays instead of
+GameState objects:
+
+  - Pacman's cell and each ghost's position, in half-cell units so that
+    scared ghosts (which move half a cell per turn) stay on integers
+  - ghost headings and scared timers
+  - food as packed 64 bit words, one bit per food cell of the layout
+  - capsules as a boolean array, and score, win and lose arrays
+
+Legal moves come from per-layout wall tables.  Pacman plays uniformly at
+random; ghosts follow RandomGhost or DirectionalGhost, vectorized.
+
+rollout() is meant as the playout backend of sampling-based agents.
+crossCheck() replays random traces through GameState.generateSuccessor and
+reports any difference between the two implementations.
+
+  python rollouts.py -l smallClassic -n 200
+"""
+
+import numpy as np
+
+from game import Directions
+import pacman
+import sys
+
+# Move i of the engine; the ghosts' start heading is STOP
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+NORTH, SOUTH, EAST, WEST, STOP = range(5)
+DX = np.array([0, 0, 1, -1, 0])
+DY = np.array([1, -1, 0, 0, 0])
+REVERSE = np.array([SOUTH, NORTH, WEST, EAST, STOP])
+
+class RolloutEngine:
+    """
+    Array state of n games on one layout.  Arrays are indexed by game, then
+    by ghost (0 is agent 1) where that applies.
+    """
+
+    def __init__(self, layout, ghostType='RandomGhost', numGhosts=4, seed=None,
+                 prob_attack=0.8, prob_scaredFlee=0.8, pacmanStops=True):
+        if ghostType not in ['RandomGhost', 'DirectionalGhost']:
+            raise Exception('Unknown ghost type ' + str(ghostType))
+        self.layout = layout
+        self.ghostType = ghostType
+        self.numGhosts = min(numGhosts, layout.getNumGhosts())
+        self.prob_attack = prob_attack
+        self.prob_scaredFlee = prob_scaredFlee
+        self.pacmanStops = pacmanStops
+        self.random = np.random.RandomState(seed)
+
+        # Per-layout tables
+        self.walls = np.array(layout.walls.data, dtype=bool)
+        self.foodCells = layout.food.asList()
+        self.foodIndex = -np.ones((layout.width, layout.height), dtype=np.int64)
+        for i, (x, y) in enumerate(self.foodCells):
+            self.foodIndex[x, y] = i
+        self.numWords = max(1, (len(self.foodCells) + 63) // 64)
+        self.capsuleCells = list(layout.capsules)
+        self.capsuleIndex = -np.ones((layout.width, layout.height), dtype=np.int64)
+        for i, (x, y) in enumerate(self.capsuleCells):
+            self.capsuleIndex[x, y] = i
+        # open[d, x, y] tells whether a move in direction d from (x, y) is legal
+        self.open = np.zeros((5, layout.width, layout.height), dtype=bool)
+        for d in range(5):
+            for x in range(layout.width):
+                for y in range(layout.height):
+                    nx, ny = x + DX[d], y + DY[d]
+                    if 0 <= nx < layout.width and 0 <= ny < layout.height and not self.walls[x, y]:
+                        self.open[d, x, y] = not self.walls[nx, ny]
+
+        start = pacman.GameState()
+        start.initialize(layout, self.numGhosts)
+        self.ghostStarts = np.array([[2 * ghost.start.pos[0], 2 * ghost.start.pos[1]]
+                                     for ghost in start.getGhostStates()], dtype=np.int64).reshape(self.numGhosts, 2)
+        self.n = 0
+
+    ######################
+    # Loading and saving #
+    ######################
+
+    def load(self, gameState, n):
+        """
+        Sets up n copies of gameState.
+        """
+        if gameState.getNumAgents() - 1 != self.numGhosts:
+            raise Exception('The engine was built for %d ghosts' % self.numGhosts)
+        self.n = n
+        x, y = gameState.getPacmanPosition()
+        self.px = np.full(n, int(x), dtype=np.int64)
+        self.py = np.full(n, int(y), dtype=np.int64)
+        ghosts = gameState.getGhostStates()
+        self.gx = np.empty((n, self.numGhosts), dtype=np.int64)
+        self.gy = np.empty((n, self.numGhosts), dtype=np.int64)
+        self.heading = np.empty((n, self.numGhosts), dtype=np.int64)
+        self.scared = np.empty((n, self.numGhosts), dtype=np.int64)
+        for i, ghost in enumerate(ghosts):
+            gx, gy = ghost.getPosition()
+            self.gx[:, i] = int(round(2 * gx))
+            self.gy[:, i] = int(round(2 * gy))
+            self.heading[:, i] = MOVES.index(ghost.getDirection())
+            self.scared[:, i] = ghost.scaredTimer
+
+        self.food = np.zeros((n, self.numWords), dtype=np.uint64)
+        self.foodCount = np.zeros(n, dtype=np.int64)
+        food = gameState.getFood()
+        for i, (x, y) in enumerate(self.foodCells):
+            if food[x][y]:
+                self.food[:, i // 64] |= np.uint64(1) << np.uint64(i % 64)
+                self.foodCount += 1
+        self.capsules = np.zeros((n, max(1, len(self.capsuleCells))), dtype=bool)
+        for pos in gameState.getCapsules():
+            self.capsules[:, self.capsuleCells.index(pos)] = True
+
+        self.score = np.full(n, gameState.data.score, dtype=np.int64)
+        self.win = np.full(n, gameState.isWin(), dtype=bool)
+        self.lose = np.full(n, gameState.isLose(), dtype=bool)
+        self.moves = np.zeros(n, dtype=np.int64)
+
+    def hasFood(self, game, x, y):
+        i = self.foodIndex[x, y]
+        if i < 0: return False
+        return bool(self.food[game, i // 64] & (np.uint64(1) << np.uint64(i % 64)))
+
+    ###########
+    # Playing #
+    ###########
+
+    def active(self):
+        return ~(self.win | self.lose)
+
+    def _choose(self, weights):
+        """
+        Samples one column per row of a non-negative (n, 5) weight array.
+        """
+        cdf = np.cumsum(weights, axis=1)
+        u = self.random.random_sample(len(weights)) * cdf[:, -1]
+        return np.minimum((cdf <= u[:, None]).sum(axis=1), 4)
+
+    def pacmanLegal(self):
+        legal = self.open[:, self.px, self.py].T.copy()
+        legal[:, STOP] = True
+        return legal
+
+    def stepPacman(self, actions=None):
+        """
+        Moves Pacman in every active game; with no actions, uniformly at
+        random among his legal moves.  Returns the moves played.
+        """
+        live = self.active()
+        if actions is None:
+            legal = self.pacmanLegal()
+            if not self.pacmanStops: legal[:, STOP] = legal[:, :STOP].sum(axis=1) == 0
+            actions = self._choose(legal.astype(np.float64))
+        actions = np.where(live, actions, STOP)
+        self.px = self.px + DX[actions] * live
+        self.py = self.py + DY[actions] * live
+        rows = np.arange(self.n)
+
+        # Eat food
+        i = self.foodIndex[self.px, self.py]
+        word = np.maximum(i, 0) // 64
+        bit = np.uint64(1) << (np.maximum(i, 0) % 64).astype(np.uint64)
+        eaten = live & (i >= 0) & ((self.food[rows, word] & bit) != 0)
+        self.food[rows[eaten], word[eaten]] &= ~bit[eaten]
+        self.foodCount -= eaten
+        self.score += 10 * eaten
+        won = eaten & (self.foodCount == 0) & ~self.lose
+        self.score += 500 * won
+        self.win |= won
+
+        # Eat capsules
+        c = self.capsuleIndex[self.px, self.py]
+        capsule = live & (c >= 0)
+        capsule[capsule] = self.capsules[rows[capsule], c[capsule]]
+        self.capsules[rows[capsule], c[capsule]] = False
+        self.scared[capsule] = pacman.SCARED_TIME
+
+        self.score -= live
+        self.moves += live
+        for ghost in range(self.numGhosts):
+            self._checkDeath(ghost, live)
+        return actions
+
+    def ghostLegal(self, ghost):
+        gx, gy = self.gx[:, ghost], self.gy[:, ghost]
+        onCell = (gx % 2 == 0) & (gy % 2 == 0)
+        legal = self.open[:, gx // 2, gy // 2].T.copy()
+        legal[:, STOP] = False
+        rows = np.arange(self.n)
+        reverse = REVERSE[self.heading[:, ghost]]
+        canTurn = legal.sum(axis=1) > 1
+        legal[rows[canTurn], reverse[canTurn]] = False
+        # Between cells a ghost can only keep going
+        legal[~onCell] = False
+        legal[rows[~onCell], self.heading[~onCell, ghost]] = True
+        return legal
+
+    def stepGhost(self, ghost, actions=None):
+        """
+        Moves one ghost in every active game, following its policy unless
+        actions are given.  Returns the moves played.
+        """
+        live = self.active()
+        legal = self.ghostLegal(ghost)
+        isScared = self.scared[:, ghost] > 0
+        speed = np.where(isScared, 1, 2)
+        if actions is None:
+            weights = legal.astype(np.float64)
+            if self.ghostType == 'DirectionalGhost':
+                nx = self.gx[:, ghost][:, None] + DX[None, :] * speed[:, None]
+                ny = self.gy[:, ghost][:, None] + DY[None, :] * speed[:, None]
+                distance = np.abs(nx - 2 * self.px[:, None]) + np.abs(ny - 2 * self.py[:, None])
+                big = 1 << 30
+                best = np.where(isScared,
+                                np.where(legal, distance, -big).max(axis=1),
+                                np.where(legal, distance, big).min(axis=1))
+                bestMoves = legal & (distance == best[:, None])
+                bestProb = np.where(isScared, self.prob_scaredFlee, self.prob_attack)
+                numLegal = legal.sum(axis=1).astype(np.float64)
+                numBest = bestMoves.sum(axis=1).astype(np.float64)
+                weights = (bestMoves * (bestProb / np.maximum(numBest, 1))[:, None] +
+                           legal * ((1 - bestProb) / np.maximum(numLegal, 1))[:, None])
+            actions = self._choose(weights)
+        actions = np.where(live, actions, STOP)
+        moving = live & (actions != STOP)
+        self.gx[:, ghost] += DX[actions] * speed * moving
+        self.gy[:, ghost] += DY[actions] * speed * moving
+        self.heading[moving, ghost] = actions[moving]
+
+        # Scared timers run down, and ghosts snap back onto a cell when they end
+        timer = self.scared[:, ghost]
+        snap = live & (timer == 1)
+        self.gx[snap, ghost] = (self.gx[snap, ghost] + 1) // 2 * 2
+        self.gy[snap, ghost] = (self.gy[snap, ghost] + 1) // 2 * 2
+        self.scared[:, ghost] = np.where(live, np.maximum(0, timer - 1), timer)
+
+        self._checkDeath(ghost, live)
+        return actions
+
+    def _checkDeath(self, ghost, live):
+        """
+        GhostRules.checkDeath for one ghost: within COLLISION_TOLERANCE of
+        Pacman a scared ghost is eaten, any other ghost eats Pacman.
+        """
+        distance = np.abs(self.gx[:, ghost] - 2 * self.px) + np.abs(self.gy[:, ghost] - 2 * self.py)
+        touching = live & (distance <= 2 * pacman.COLLISION_TOLERANCE)
+        eaten = touching & (self.scared[:, ghost] > 0)
+        self.score += 200 * eaten
+        self.gx[eaten, ghost] = self.ghostStarts[ghost, 0]
+        self.gy[eaten, ghost] = self.ghostStarts[ghost, 1]
+        self.heading[eaten, ghost] = STOP
+        self.scared[eaten, ghost] = 0
+        killed = touching & ~eaten & ~self.win
+        self.score -= 500 * killed
+        self.lose |= killed
+
+    def stepRound(self):
+        """
+        Plays Pacman's move and every ghost's reply.  Returns the moves played
+        as an (n, 1 + numGhosts) array.
+        """
+        actions = np.empty((self.n, 1 + self.numGhosts), dtype=np.int64)
+        actions[:, 0] = self.stepPacman()
+        for ghost in range(self.numGhosts):
+            actions[:, ghost + 1] = self.stepGhost(ghost)
+        return actions
+
+    def rollout(self, gameState, n, maxMoves=1000):
+        """
+        Plays n random playouts from gameState for at most maxMoves rounds.
+        Returns the final (score, win, lose) arrays.
+        """
+        self.load(gameState, n)
+        for move in range(maxMoves):
+            if not self.active().any(): break
+            self.stepRound()
+        return self.score.copy(), self.win.copy(), self.lose.copy()
+
+################
+# Cross-checks #
+################
+
+def compareState(engine, game, state):
+    """
+    Returns a description of the first difference between game number game
+    of the engine and state, or None.
+    """
+    if state.isWin() != engine.win[game] or state.isLose() != engine.lose[game]:
+        return 'win/lose %s/%s vs %s/%s' % (state.isWin(), state.isLose(), engine.win[game], engine.lose[game])
+    if state.data.score != engine.score[game]:
+        return 'score %s vs %s' % (state.data.score, engine.score[game])
+    if state.getPacmanPosition() != (engine.px[game], engine.py[game]):
+        return 'pacman at %s vs %s' % (state.getPacmanPosition(), (engine.px[game], engine.py[game]))
+    for i, ghost in enumerate(state.getGhostStates()):
+        pos = (engine.gx[game, i] / 2.0, engine.gy[game, i] / 2.0)
+        if ghost.getPosition() != pos:
+            return 'ghost %d at %s vs %s' % (i + 1, ghost.getPosition(), pos)
+        if ghost.scaredTimer != engine.scared[game, i]:
+            return 'ghost %d scared for %d vs %d' % (i + 1, ghost.scaredTimer, engine.scared[game, i])
+        if MOVES.index(ghost.getDirection()) != engine.heading[game, i]:
+            return 'ghost %d heading %s vs %s' % (i + 1, ghost.getDirection(), MOVES[engine.heading[game, i]])
+    for x, y in engine.foodCells:
+        if state.hasFood(x, y) != engine.hasFood(game, x, y):
+            return 'food at %s' % ((x, y),)
+    if sorted(state.getCapsules()) != sorted([engine.capsuleCells[c] for c in np.nonzero(engine.capsules[game])[0]]):
+        return 'capsules %s' % state.getCapsules()
+    return None
+
+def crossCheck(layout, ghostType='RandomGhost', numGhosts=4, numTraces=100, maxMoves=300, seed=0):
+    """
+    Plays numTraces random games in the engine, replays every move through
+    GameState.generateSuccessor and compares the two after each move.
+    Returns a list of (trace, move, difference) for the traces that diverged.
+    """
+    engine = RolloutEngine(layout, ghostType, numGhosts, seed)
+    start = pacman.GameState()
+    start.initialize(layout, engine.numGhosts)
+    engine.load(start, numTraces)
+    states = [start] * numTraces
+    failures = {}
+    for move in range(maxMoves):
+        live = engine.active()
+        if not live.any(): break
+        moves = [engine.stepPacman()]
+        for ghost in range(engine.numGhosts):
+            moves.append(engine.stepGhost(ghost))
+        for game in range(numTraces):
+            if not live[game] or game in failures: continue
+            state = states[game]
+            for agentIndex, agentMoves in enumerate(moves):
+                if state.isWin() or state.isLose(): break
+                state = state.generateSuccessor(agentIndex, MOVES[agentMoves[game]])
+            states[game] = state
+            difference = compareState(engine, game, state)
+            if difference is not None:
+                failures[game] = (game, move, difference)
+        pacman.GameState.getAndResetExplored()
+    return sorted(failures.values())
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python rollouts.py <options>
+    EXAMPLES:   python rollouts.py -l smallClassic -g DirectionalGhost -n 200
+                    - cross-checks 200 random traces against pacman.py
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE to play on [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='RandomGhost or DirectionalGhost [Default: %default]')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('-n', '--numTraces', type='int', dest='numTraces', default=100,
+                      help='the number of random traces to check [Default: %default]')
+    parser.add_option('-m', '--maxMoves', type='int', dest='maxMoves', default=300,
+                      help='the longest trace to check [Default: %default]')
+    parser.add_option('--seed', type='int', dest='seed', default=0,
+                      help='the random seed of the traces [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import layout
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    failures = crossCheck(lay, options.ghost, options.numGhosts, options.numTraces, options.maxMoves, options.seed)
+    for trace, move, difference in failures:
+        print 'Trace %d diverged at move %d: %s' % (trace, move, difference)
+    print '%d of %d traces agree with pacman.py' % (options.numTraces - len(failures), options.numTraces)
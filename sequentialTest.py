@@ -0,0 +1,216 @@
+# sequentialTest.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Comparing two Pacman agents with as few games as the evidence allows.
+
+Both agents play the same games: game i of each is seeded alike, so each
+pair faces the same ghost dice.  Pairs are played in batches, and after
+every batch two sequential tests look at the results:
+
+  win rate  Wald's SPRT over the pairs one agent won and the other lost,
+            with an indifference zone of +-delta around a fair split
+  score     a normal confidence interval for the mean score difference,
+            at level alpha / (number of looks), so that stopping at any
+            look keeps the error rate under alpha
+
+The comparison stops when the test(s) chosen with --stopOn reach a
+decision, or after numGames pairs.  Stopping on any decision gives two
+chances of a wrong one, so then each test runs at alpha / 2.
+
+  python sequentialTest.py -l smallClassic -A ExpectimaxAgent,depth=2 -B GreedyAgent -k 2 -n 200
+"""
+
+import math
+import sys
+
+def normalQuantile(p):
+    """
+    The x with P(Z <= x) = p for a standard normal Z.
+    """
+    low, high = -40.0, 40.0
+    for i in range(100):
+        middle = (low + high) / 2
+        if 0.5 * (1 + math.erf(middle / math.sqrt(2))) < p: low = middle
+        else: high = middle
+    return (low + high) / 2
+
+class WinRateSPRT:
+    """
+    Decides whether A wins more of the pairs the agents split (H1: A wins
+    a share 0.5 + delta of them) or B does (H0: 0.5 - delta), with error
+    rates alpha and beta.
+    """
+
+    def __init__(self, delta=0.1, alpha=0.05, beta=0.05):
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+        self.winStep = math.log((0.5 + delta) / (0.5 - delta))
+        self.lossStep = -self.winStep
+        self.winsA = 0
+        self.winsB = 0
+        self.llr = 0.0
+
+    def add(self, winA, winB):
+        if winA and not winB:
+            self.winsA += 1
+            self.llr += self.winStep
+        elif winB and not winA:
+            self.winsB += 1
+            self.llr += self.lossStep
+
+    def decision(self):
+        if self.llr >= self.upper: return 'A'
+        if self.llr <= self.lower: return 'B'
+        return None
+
+class ScoreDifferenceTest:
+    """
+    Decides whether the mean of scoreA - scoreB is above or below zero,
+    looking at most looks times with error rate alpha overall.
+    """
+
+    def __init__(self, looks, alpha=0.05, minPairs=10):
+        self.z = normalQuantile(1 - alpha / (2.0 * looks))
+        self.minPairs = minPairs
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, scoreA, scoreB):
+        difference = scoreA - scoreB
+        self.n += 1
+        delta = difference - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (difference - self.mean)
+
+    def halfWidth(self):
+        if self.n < 2: return float('inf')
+        return self.z * math.sqrt(self.m2 / (self.n - 1) / self.n)
+
+    def decision(self):
+        if self.n < self.minPairs: return None
+        if self.mean - self.halfWidth() > 0: return 'A'
+        if self.mean + self.halfWidth() < 0: return 'B'
+        return None
+
+def playPairs(matchupA, matchupB, gameIndices, seed, timeout, pool=None):
+    """
+    Plays games gameIndices of both matchups and returns their GameResults
+    in pairs.
+    """
+    import pacman, tournament
+    jobs = []
+    for gameIndex in gameIndices:
+        gameSeed = pacman.deriveSeed(seed, gameIndex)
+        jobs += [(matchupA, gameIndex, gameSeed, timeout), (matchupB, gameIndex, gameSeed, timeout)]
+    if pool != None: played = pool.map(tournament.playMatch, jobs)
+    else: played = [tournament.playMatch(job) for job in jobs]
+    results = [result for job, result, seconds in played]
+    return zip(results[0::2], results[1::2])
+
+def compare(matchupA, matchupB, numGames, batchSize=10, seed=0, timeout=30, workers=1,
+            delta=0.1, alpha=0.05, stopOn='any'):
+    """
+    Plays paired batches of matchupA and matchupB, tournament matchups that
+    differ only in their Pacman, until stopOn ('win', 'score', 'any' or
+    'all' of the two tests) is decided or numGames pairs are played.
+    With stopOn 'any' alpha is split between the tests, which keeps the
+    chance that either one decides wrongly under alpha.
+    Returns the win rate test, the score test and the number of pairs.
+    """
+    import multiprocessing
+    looks = (numGames + batchSize - 1) / batchSize
+    testAlpha = alpha
+    if stopOn == 'any': testAlpha = alpha / 2.0
+    winTest = WinRateSPRT(delta, testAlpha, testAlpha)
+    scoreTest = ScoreDifferenceTest(looks, testAlpha)
+    pool = None
+    if workers > 1: pool = multiprocessing.Pool(workers)
+    pairs = 0
+    try:
+        while pairs < numGames:
+            batch = range(pairs, min(pairs + batchSize, numGames))
+            for resultA, resultB in playPairs(matchupA, matchupB, batch, seed, timeout, pool):
+                winTest.add(resultA.win, resultB.win)
+                scoreTest.add(resultA.score, resultB.score)
+            pairs += len(batch)
+            print '%4d pairs: A won %d and B won %d of the split pairs (LLR %+.2f); score A - B %+.1f +- %.1f' % (
+                pairs, winTest.winsA, winTest.winsB, winTest.llr, scoreTest.mean, scoreTest.halfWidth())
+            decisions = [winTest.decision(), scoreTest.decision()]
+            if stopOn == 'win': decided = decisions[0] != None
+            elif stopOn == 'score': decided = decisions[1] != None
+            elif stopOn == 'all': decided = None not in decisions
+            else: decided = decisions != [None, None]
+            if decided: break
+        if pool != None: pool.close()
+    finally:
+        if pool != None:
+            pool.terminate()
+            pool.join()
+    return winTest, scoreTest, pairs
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python sequentialTest.py <options>
+    EXAMPLES:   python sequentialTest.py -l smallClassic -A ExpectimaxAgent,depth=2 -B GreedyAgent -n 200
+                    - plays paired games until it is clear which Pacman is better
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-A', dest='pacmanA', help='the first Pacman, as TYPE or TYPE,opt1=val1,...')
+    parser.add_option('-B', dest='pacmanB', help='the second Pacman, as TYPE or TYPE,opt1=val1,...')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE from which to load the map layout [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='the ghost agent TYPE in the ghostAgents module to use [Default: %default]', metavar='TYPE')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=200,
+                      help='the most pairs of games to play [Default: %default]')
+    parser.add_option('--batch', dest='batchSize', type='int', default=10,
+                      help='the pairs played between looks at the results [Default: %default]')
+    parser.add_option('--alpha', dest='alpha', type='float', default=0.05,
+                      help='the error rate of each test, or of both together with --stopOn any [Default: %default]')
+    parser.add_option('--delta', dest='delta', type='float', default=0.1,
+                      help='the win rate test ignores splits within 0.5 +- delta [Default: %default]')
+    parser.add_option('--stopOn', dest='stopOn', type='choice', choices=['win', 'score', 'any', 'all'], default='any',
+                      help='the test(s) that must decide before stopping: win, score, any or all [Default: %default]')
+    parser.add_option('--workers', dest='workers', type='int', default=1,
+                      help='the number of processes to play in [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='float', default=30,
+                      help='Maximum length of time an agent can spend computing in a single game [Default: %default]')
+    parser.add_option('--seed', dest='seed', default='0',
+                      help='the seed games are derived from [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if not options.pacmanA or not options.pacmanB: raise Exception('Give the two Pacmen with -A and -B')
+    return options
+
+if __name__ == '__main__':
+    import layout
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    numGhosts = min(options.numGhosts, lay.getNumGhosts())
+    matchupA = (options.layout, options.pacmanA, options.ghost, numGhosts)
+    matchupB = (options.layout, options.pacmanB, options.ghost, numGhosts)
+    winTest, scoreTest, pairs = compare(matchupA, matchupB, options.numGames, options.batchSize, options.seed,
+                                        options.timeout, options.workers, options.delta, options.alpha, options.stopOn)
+    names = {'A': options.pacmanA, 'B': options.pacmanB, None: 'undecided'}
+    print
+    print 'Win rate:  %s' % names[winTest.decision()]
+    print 'Score:     %s' % names[scoreTest.decision()]
+    print 'Played %d of %d pairs, saving %d games' % (pairs, options.numGames, 2 * (options.numGames - pairs))
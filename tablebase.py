@@ -0,0 +1,319 @@
+# tablebase.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Endgame tablebases for small layouts.
+
+A tablebase stores, for every position reachable from the start of a layout
+with Pacman to move, the exact minimax value of the rest of the game (the
+score Pacman still gains when every ghost plays to minimize it) together
+with Pacman's best move.  Only layouts without capsules are covered, so no
+ghost is ever scared.
+
+Positions are solved by retrograde analysis: food can only disappear, so
+positions are grouped by the set of food left and the groups are solved
+from the emptiest board upwards.  Inside one group, moves either keep the
+food set (and stay in the group) or eat something (and land in a group that
+is already solved), so each group is settled by iterating the minimax
+backup to a fixed point.  Successors are generated with
+GameState.generateSuccessor, so the table follows the game rules exactly.
+
+The file is a header followed by three sorted, fixed width arrays (keys,
+values, moves) that are searched in place through mmap.  To build one:
+
+  python tablebase.py -l trappedClassic
+"""
+
+from game import Directions
+from game import Configuration
+import hashlib, mmap, os, struct, sys
+
+MAGIC = 'PMTB'
+VERSION = 1
+HEADER = struct.Struct('<4sIII20s')   # magic, version, numGhosts, numEntries, layout digest
+KEY = struct.Struct('<Q')
+VALUE = struct.Struct('<i')
+MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+
+def layoutDigest(layout):
+    return hashlib.sha1('\n'.join(layout.layoutText)).digest()
+
+class TablebaseIndex:
+    """
+    Maps Pacman-to-move positions of one layout to integer keys.  A key is
+    the mixed-radix number (Pacman cell, ghost cell and heading for every
+    ghost) followed by a bitmask of the food cells that still hold food.
+    """
+
+    def __init__(self, layout, numGhosts):
+        self.cells = layout.walls.asList(False)
+        self.cellIndex = dict([(cell, i) for i, cell in enumerate(self.cells)])
+        self.foodCells = layout.food.asList()
+        self.numGhosts = numGhosts
+        self.ghostRadix = len(self.cells) * len(MOVES)
+        if len(self.cells) * self.ghostRadix ** numGhosts * 2 ** len(self.foodCells) >= 2 ** 64:
+            raise Exception('Layout is too large for a tablebase')
+
+    def encode(self, gameState):
+        """
+        Returns the key of gameState, or None if the position cannot be in a
+        tablebase (terminal, capsules left, scared or moving ghosts).
+        """
+        if gameState.isWin() or gameState.isLose(): return None
+        if gameState.getNumAgents() - 1 != self.numGhosts: return None
+        if len(gameState.getCapsules()) > 0: return None
+        pacmanPos = gameState.getPacmanPosition()
+        if pacmanPos not in self.cellIndex: return None
+        key = self.cellIndex[pacmanPos]
+        for ghostState in gameState.getGhostStates():
+            if ghostState.scaredTimer > 0: return None
+            pos = ghostState.getPosition()
+            if pos not in self.cellIndex: return None
+            key = key * self.ghostRadix + self.cellIndex[pos] * len(MOVES) + MOVES.index(ghostState.getDirection())
+        return (key << len(self.foodCells)) | self.foodMask(gameState.getFood())
+
+    def foodMask(self, food):
+        mask = 0
+        for i, (x, y) in enumerate(self.foodCells):
+            if food[x][y]: mask |= 1 << i
+        return mask
+
+    def foodOf(self, key):
+        return key & ((1 << len(self.foodCells)) - 1)
+
+    def decode(self, key, startState):
+        """
+        Rebuilds the position for key from the start state of the layout,
+        with a score of zero.
+        """
+        import pacman
+        state = pacman.GameState(startState)
+        food = self.foodOf(key)
+        state.data.food = startState.data.food.copy()
+        for i, (x, y) in enumerate(self.foodCells):
+            state.data.food[x][y] = bool(food & (1 << i))
+        state.data.score = 0
+        key >>= len(self.foodCells)
+        for agentState in reversed(state.data.agentStates[1:]):
+            key, ghost = divmod(key, self.ghostRadix)
+            cell, heading = divmod(ghost, len(MOVES))
+            agentState.configuration = Configuration(self.cells[cell], MOVES[heading])
+        state.data.agentStates[0].configuration = Configuration(self.cells[key], Directions.STOP)
+        return state
+
+class Tablebase:
+    """
+    Read-only access to a tablebase file.  The file is memory mapped, so
+    opening it is cheap and probes only touch the pages they need.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        f = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        magic, version, self.numGhosts, self.numEntries, self.digest = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception('%s is not a tablebase file' % path)
+        self.keysOffset = HEADER.size
+        self.valuesOffset = self.keysOffset + KEY.size * self.numEntries
+        self.movesOffset = self.valuesOffset + VALUE.size * self.numEntries
+        self._layout = None
+        self._index = None
+
+    def getIndex(self, layout):
+        """
+        Returns the TablebaseIndex for layout, or None if this tablebase was
+        built for a different layout.
+        """
+        if layout is not self._layout:
+            self._layout = layout
+            self._index = None
+            if layoutDigest(layout) == self.digest:
+                self._index = TablebaseIndex(layout, self.numGhosts)
+        return self._index
+
+    def probe(self, gameState):
+        """
+        Returns (value, move) for a covered position, where value is the
+        score Pacman still gains under minimax play, or None.
+        """
+        index = self.getIndex(gameState.data.layout)
+        if index is None: return None
+        key = index.encode(gameState)
+        if key is None: return None
+        lo, hi = 0, self.numEntries
+        while lo < hi:
+            mid = (lo + hi) // 2
+            midKey = KEY.unpack_from(self.data, self.keysOffset + KEY.size * mid)[0]
+            if midKey < key: lo = mid + 1
+            elif midKey > key: hi = mid
+            else:
+                value = VALUE.unpack_from(self.data, self.valuesOffset + VALUE.size * mid)[0]
+                move = MOVES[ord(self.data[self.movesOffset + mid])]
+                return value, move
+        return None
+
+    def close(self):
+        self.data.close()
+
+def expandRound(state, agentIndex, outcomes):
+    """
+    Appends (state after the round, or the terminal state) for every
+    combination of ghost replies to the Pacman move that produced state.
+    """
+    if state.isWin() or state.isLose() or agentIndex == state.getNumAgents():
+        outcomes.append(state)
+        return
+    for action in state.getLegalActions(agentIndex):
+        expandRound(state.generateSuccessor(agentIndex, action), agentIndex + 1, outcomes)
+
+def solve(layout, numGhosts, maxStates=2000000, maxIterations=1000, verbose=True):
+    """
+    Solves every Pacman-to-move position reachable from the start of layout.
+    Returns a dictionary key -> (value, move index) and the index used.
+    """
+    import pacman
+    if len(layout.capsules) > 0:
+        raise Exception('Tablebases only cover layouts without capsules')
+    start = pacman.GameState()
+    start.initialize(layout, numGhosts)
+    numGhosts = start.getNumAgents() - 1
+    index = TablebaseIndex(layout, numGhosts)
+
+    # Forward pass: enumerate positions and, for each Pacman move, the
+    # (reward, next key) outcomes of every combination of ghost replies.
+    graph = {}
+    frontier = [index.encode(start)]
+    graph[frontier[0]] = None
+    while frontier:
+        key = frontier.pop()
+        state = index.decode(key, start)
+        pacman.GameState.getAndResetExplored()
+        edges = []
+        for action in state.getLegalActions(0):
+            outcomes = []
+            expandRound(state.generateSuccessor(0, action), 1, outcomes)
+            replies = []
+            for nextState in outcomes:
+                reward = nextState.data.score - state.data.score
+                nextKey = index.encode(nextState)
+                replies.append((reward, nextKey))
+                if nextKey is not None and nextKey not in graph:
+                    if len(graph) >= maxStates:
+                        raise Exception('More than %d positions; the layout is too large' % maxStates)
+                    graph[nextKey] = None
+                    frontier.append(nextKey)
+            edges.append((MOVES.index(action), replies))
+        graph[key] = edges
+    if verbose: print 'Enumerated %d positions' % len(graph)
+
+    # Retrograde pass, one food set at a time from the emptiest board up.
+    groups = {}
+    for key in graph:
+        groups.setdefault(index.foodOf(key), []).append(key)
+    solved = {}
+    unsolved = set()
+    for food in sorted(groups.keys(), key=lambda mask: bin(mask).count('1')):
+        keys = groups[food]
+        bound = 10 * bin(food).count('1') + 500
+        values = dict([(key, bound) for key in keys])
+        moves = {}
+
+        # A position is unsolvable if it can reach an unsolved one
+        pending = set(keys)
+        changed = True
+        while changed:
+            changed = False
+            for key in list(pending):
+                for move, replies in graph[key]:
+                    if [nextKey for reward, nextKey in replies if nextKey in unsolved]:
+                        pending.discard(key)
+                        unsolved.add(key)
+                        changed = True
+                        break
+
+        for iteration in range(maxIterations):
+            changed = False
+            for key in pending:
+                best, bestMove = None, None
+                for move, replies in graph[key]:
+                    worst = None
+                    for reward, nextKey in replies:
+                        if nextKey is None: value = reward
+                        elif nextKey in values: value = reward + values[nextKey]
+                        else: value = reward + solved[nextKey][0]
+                        if worst is None or value < worst: worst = value
+                    if best is None or worst > best:
+                        best, bestMove = worst, move
+                if best != values[key]:
+                    values[key] = best
+                    changed = True
+                moves[key] = bestMove
+            if not changed: break
+        if changed:
+            unsolved.update(pending)
+            continue
+        for key in pending:
+            solved[key] = (values[key], moves[key])
+    if verbose: print 'Solved %d positions (%d unsolved)' % (len(solved), len(unsolved))
+    return solved, index
+
+def writeTablebase(path, layout, numGhosts, solved):
+    keys = sorted(solved.keys())
+    f = open(path, 'wb')
+    try:
+        f.write(HEADER.pack(MAGIC, VERSION, numGhosts, len(keys), layoutDigest(layout)))
+        for key in keys: f.write(KEY.pack(key))
+        for key in keys: f.write(VALUE.pack(solved[key][0]))
+        f.write(''.join([chr(solved[key][1]) for key in keys]))
+    finally:
+        f.close()
+
+def buildTablebase(layout, path, numGhosts=None, maxStates=2000000, verbose=True):
+    if numGhosts is None: numGhosts = layout.getNumGhosts()
+    solved, index = solve(layout, numGhosts, maxStates, verbose=verbose)
+    writeTablebase(path, layout, index.numGhosts, solved)
+    if verbose: print 'Wrote %s (%d bytes)' % (path, os.path.getsize(path))
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python tablebase.py <options>
+    EXAMPLES:   python tablebase.py -l trappedClassic
+                    - solves trappedClassic and writes trappedClassic.tb
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='trappedClassic',
+                      help='the LAYOUT_FILE to solve [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=None,
+                      help='the number of ghosts to use [Default: all ghosts in the layout]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='the tablebase file to write [Default: LAYOUT_FILE.tb]')
+    parser.add_option('--maxStates', dest='maxStates', type='int', default=2000000,
+                      help='give up on layouts with more positions than this [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+if __name__ == '__main__':
+    import layout
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    output = options.output or options.layout + '.tb'
+    buildTablebase(lay, output, options.numGhosts, options.maxStates)
@@ -0,0 +1,65 @@
+# test_deadlines.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Searches stop at their deadline off the main thread, where no alarm can
+interrupt them.
+
+  python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import layout, multiAgents, pacman, util
+
+class ThreadedDeadline(unittest.TestCase):
+
+    def search(self, agent, timeout):
+        """
+        Runs agent's move under a timeout on another thread and returns
+        what it raised, if anything, and how long it took.
+        """
+        state = pacman.GameState()
+        state.initialize(layout.getLayout('mediumClassic'), 2)
+        outcome = {}
+        def run():
+            start = time.time()
+            try: util.TimeoutFunction(agent.getAction, timeout)(state)
+            except util.TimeoutFunctionException, e: outcome['raised'] = e
+            outcome['seconds'] = time.time() - start
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(60)
+        self.assertFalse(thread.is_alive())
+        return outcome.get('raised'), outcome['seconds']
+
+    def testDeepSearchStopsAtDeadline(self):
+        # Depth 8 takes most of a minute to search in full
+        raised, seconds = self.search(multiAgents.AlphaBetaAgent(depth='8'), 0.2)
+        self.assertTrue(isinstance(raised, util.TimeoutFunctionException))
+        self.assertTrue(seconds < 5, 'the search ran %.1fs past a 0.2s deadline' % seconds)
+
+    def testShallowSearchFinishes(self):
+        raised, seconds = self.search(multiAgents.MinimaxAgent(depth='1'), 10)
+        self.assertEqual(raised, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+# test_remoteAgent.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Games played in parallel against one agent server keep to their own
+sessions.
+
+  python -m unittest discover tests
+"""
+
+import copy
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import ghostAgents, layout, multiAgents, pacman, remoteAgent, textDisplay
+
+class ParallelSessions(unittest.TestCase):
+
+    def setUp(self):
+        self.server = remoteAgent.startLocalServer('127.0.0.1', 0)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def play(self, agent, workers):
+        lay = layout.getLayout('smallClassic')
+        ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(2)]
+        games = pacman.runGames(lay, agent, ghosts, textDisplay.NullGraphics(), 4, False,
+                                workers=workers, seed=1, stream=True)
+        return [(result.score, result.win, result.numMoves) for result in games]
+
+    def testTwoWorkersShareAServer(self):
+        host, port = self.server.server_address
+        remote = remoteAgent.RemoteAgent(host, port, 'AlphaBetaAgent', 0, {'depth': '2'})
+        self.assertEqual(self.play(remote, 2), self.play(multiAgents.AlphaBetaAgent(depth='2'), 1))
+        self.assertEqual(self.server.sessions, {})
+
+    def testCopiesOpenTheirOwnSessions(self):
+        host, port = self.server.server_address
+        state = pacman.GameState()
+        state.initialize(layout.getLayout('smallClassic'), 2)
+        first = remoteAgent.RemoteAgent(host, port, 'GreedyAgent')
+        first.registerInitialState(state)
+        second = copy.deepcopy(first)
+        second.registerInitialState(state)
+        self.assertNotEqual(first.session, second.session)
+        self.assertEqual(len(self.server.sessions), 2)
+        remoteAgent.closeRemoteAgents([first, second])
+        self.assertEqual(self.server.sessions, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# test_resultCache.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Results cached by pacman.py run as a script load in other programs.
+
+  python -m unittest discover tests
+"""
+
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import layout, pacman, pacmanAgents, ghostAgents, resultCache, textDisplay
+
+class ResultCacheRoundTrip(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def playScript(self):
+        return subprocess.check_output([sys.executable, 'pacman.py', '-q', '-p', 'GreedyAgent', '-l', 'smallClassic',
+                                        '-k', '2', '-n', '2', '--seed', '3', '--cache', self.path], cwd=ROOT)
+
+    def testScriptResultsLoadElsewhere(self):
+        self.assertTrue('Found 0 of 2 games' in self.playScript())
+        db = sqlite3.connect(self.path)
+        keys = [row[0] for row in db.execute('SELECT DISTINCT run FROM gameResults')]
+        db.close()
+        self.assertEqual(len(keys), 1)
+
+        cache = resultCache.ResultCache(self.path, keys[0])
+        try: cached = cache.lookup(3, range(2))
+        finally: cache.close()
+        self.assertEqual(sorted(cached), [0, 1])
+
+        lay = layout.getLayout('smallClassic')
+        ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(2)]
+        games = pacman.runGames(lay, pacmanAgents.GreedyAgent(), ghosts, textDisplay.NullGraphics(), 2, False, seed=3)
+        for i, game in enumerate(games):
+            result = cached[i]
+            self.assertTrue(isinstance(result, pacman.GameResult))
+            self.assertEqual(result.score, game.state.getScore())
+            self.assertEqual(result.win, game.state.isWin())
+            self.assertEqual(result.lose, game.state.isLose())
+            self.assertEqual(result.numMoves, len(game.moveHistory))
+            self.assertEqual(result.seed, pacman.deriveSeed(3, i))
+            self.assertEqual(len(result.totalAgentTimes), len(game.agents))
+            self.assertEqual(result.moveHistory, None)
+
+        self.assertTrue('Found 2 of 2 games' in self.playScript())
+
+    def testHistoryIsKept(self):
+        result = pacman.GameResult(seed=5)
+        result.score, result.win, result.lose, result.numMoves = -12.5, False, True, 3
+        result.agentTimeout, result.agentCrashed, result.adjudicated = False, True, 'stalled'
+        result.totalAgentTimes = [0.25, 0.0]
+        result.moveHistory = [(0, 'West'), (1, 'East'), (0, None)]
+        cache = resultCache.ResultCache(self.path, 'key')
+        cache.store('master', 0, result)
+        cache.commit()
+        loaded = cache.lookup('master', [0])[0]
+        cache.close()
+        self.assertEqual(loaded.__dict__, result.__dict__)
+
+if __name__ == '__main__':
+    unittest.main()
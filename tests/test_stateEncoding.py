@@ -0,0 +1,124 @@
+# test_stateEncoding.py
+# ---------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+GameState keys, pickles and hashes, and Grid bit packing.
+
+  python -m unittest discover tests
+"""
+
+import cPickle
+import os
+import random
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import game, layout, pacman
+
+def playedStates(layoutName, numGhosts, moves, seed):
+    """
+    The states of a game of random moves on layoutName, start included.
+    """
+    rand = random.Random(seed)
+    state = pacman.GameState()
+    state.initialize(layout.getLayout(layoutName), numGhosts)
+    states = [state]
+    agentIndex = 0
+    while len(states) <= moves and not (state.isWin() or state.isLose()):
+        state = state.generateSuccessor(agentIndex, rand.choice(state.getLegalActions(agentIndex)))
+        states.append(state)
+        agentIndex = (agentIndex + 1) % state.getNumAgents()
+    return states
+
+def oldPackBits(grid):
+    """
+    Grid.packBits as it was, one cell at a time.
+    """
+    bits = [grid.width, grid.height]
+    currentInt = 0
+    for i in range(grid.height * grid.width):
+        bit = grid.CELLS_PER_INT - (i % grid.CELLS_PER_INT) - 1
+        x, y = i / grid.height, i % grid.height
+        if grid[x][y]:
+            currentInt += 2 ** bit
+        if (i + 1) % grid.CELLS_PER_INT == 0:
+            bits.append(currentInt)
+            currentInt = 0
+    bits.append(currentInt)
+    return tuple(bits)
+
+class StateEncoding(unittest.TestCase):
+
+    def setUp(self):
+        self.states = playedStates('mediumClassic', 2, 60, 1) + playedStates('smallClassic', 2, 60, 2)
+
+    def testKeysRoundTrip(self):
+        for state in self.states:
+            decoded = pacman.GameState.decode(state.data.layout, state.encode())
+            self.assertEqual(decoded, state)
+            self.assertEqual(decoded.encode(), state.encode())
+            self.assertEqual(decoded.getScore(), state.getScore())
+            self.assertEqual(decoded.getCapsules(), state.getCapsules())
+            self.assertEqual(decoded.getFood().asList(), state.getFood().asList())
+            self.assertEqual(decoded.getGhostStates(), state.getGhostStates())
+
+    def testPicklesRoundTrip(self):
+        for state in self.states[::10]:
+            for protocol in [0, cPickle.HIGHEST_PROTOCOL]:
+                loaded = cPickle.loads(cPickle.dumps(state, protocol))
+                self.assertEqual(loaded, state)
+                self.assertEqual(loaded.encode(), state.encode())
+
+    def testHashAgreesWithEquality(self):
+        for state in self.states:
+            for same in [state.deepCopy(), pacman.GameState.decode(state.data.layout, state.encode())]:
+                self.assertEqual(same, state)
+                self.assertEqual(hash(same), hash(state))
+        for first, second in zip(self.states, self.states[1:]):
+            self.assertEqual(first == second, first.encode() == second.encode())
+        decoded = [pacman.GameState.decode(state.data.layout, state.encode()) for state in self.states]
+        keys = set([state.encode() for state in self.states])
+        self.assertEqual(len(set(self.states + decoded)), len(keys))
+
+class GridPacking(unittest.TestCase):
+
+    def grids(self):
+        rand = random.Random(0)
+        for width, height in [(1, 1), (3, 10), (5, 6), (20, 11), (28, 27)]:
+            for fill in [0.0, 0.3, 1.0]:
+                grid = game.Grid(width, height)
+                for x in range(width):
+                    for y in range(height):
+                        grid[x][y] = rand.random() < fill
+                yield grid
+
+    def testPackBitsMatchesOldVersion(self):
+        for grid in self.grids():
+            self.assertEqual(grid.packBits(), oldPackBits(grid))
+
+    def testPackBitsRoundTrip(self):
+        for grid in self.grids():
+            self.assertEqual(game.reconstituteGrid(grid.packBits()), grid)
+
+    def testPackBytesRoundTrip(self):
+        for grid in self.grids():
+            unpacked = game.Grid(grid.width, grid.height)
+            unpacked.unpackBytes(grid.packBytes())
+            self.assertEqual(unpacked, grid)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,207 @@
+# topology.py
+# -----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Static analysis of the maze graph of a layout.
+
+The open cells of a layout form an undirected graph.  Cells that survive
+repeatedly peeling off degree-one cells form the 2-core of that graph: from
+any core cell Pacman can keep moving without ever having to turn back.  All
+other cells hang off the core in trees, and walking into one of those trees
+means walking into a dead end.
+
+A LayoutTopology labels, for every move between two open cells, how deep the
+dead end on the far side of the move is, together with each dead-end cell's
+distance to the exit and the articulation points of the maze.  It also
+answers maze distance queries between cells.
+"""
+
+from game import Actions
+from util import nearestPoint
+
+TOPOLOGY_CACHE = {}
+
+class LayoutTopology:
+    """
+    Dead-end corridors and articulation points of a layout.
+
+    deadEndDepth[(p, q)] is the number of cells Pacman can walk through,
+    starting at q and never stepping back onto p, before being forced to turn
+    around.  Moves that lead back to the core have no entry.
+    exitDistance[c] is the number of steps from dead-end cell c to the core,
+    or None for cells in a maze that has no core at all (a tree).
+    """
+
+    def __init__(self, layout):
+        self.walls = layout.walls
+        self.cells = layout.walls.asList(False)
+        self.neighbors = {}
+        for cell in self.cells:
+            self.neighbors[cell] = [neighbor for neighbor in Actions.getLegalNeighbors(cell, self.walls)
+                                    if neighbor != cell]
+
+        self.core = self._computeCore()
+        self.exitDistance = self._computeExitDistances()
+        self.deadEndDepth = self._computeDeadEndDepths()
+        self.articulationPoints = self._computeArticulationPoints()
+        self._distances = {}
+
+    def isDeadEnd(self, cell):
+        return cell in self.neighbors and cell not in self.core
+
+    def getDeadEndDepth(self, fromCell, toCell):
+        """
+        Returns the depth of the dead end entered by moving from fromCell to
+        toCell, or 0 if that move does not lead into a dead end.
+        """
+        return self.deadEndDepth.get((fromCell, toCell), 0)
+
+    def isArticulationPoint(self, cell):
+        return cell in self.articulationPoints
+
+    def getMazeDistance(self, pos1, pos2):
+        """
+        Returns the shortest path length between two positions, rounding
+        positions of ghosts that are between cells.  Distances are computed
+        by breadth-first search the first time a cell is used as a source.
+        """
+        source, target = nearestPoint(pos1), nearestPoint(pos2)
+        if source not in self._distances:
+            self._distances[source] = self._breadthFirstDistances(source)
+        return self._distances[source].get(target, float('inf'))
+
+    def _breadthFirstDistances(self, source):
+        distances = {source: 0}
+        frontier = [source]
+        while frontier:
+            nextFrontier = []
+            for cell in frontier:
+                for neighbor in self.neighbors.get(cell, []):
+                    if neighbor not in distances:
+                        distances[neighbor] = distances[cell] + 1
+                        nextFrontier.append(neighbor)
+            frontier = nextFrontier
+        return distances
+
+    def _computeCore(self):
+        degree = dict([(cell, len(self.neighbors[cell])) for cell in self.cells])
+        removed = set()
+        leaves = [cell for cell in self.cells if degree[cell] <= 1]
+        while leaves:
+            cell = leaves.pop()
+            if cell in removed: continue
+            removed.add(cell)
+            for neighbor in self.neighbors[cell]:
+                if neighbor in removed: continue
+                degree[neighbor] -= 1
+                if degree[neighbor] <= 1:
+                    leaves.append(neighbor)
+        return set([cell for cell in self.cells if cell not in removed])
+
+    def _computeExitDistances(self):
+        distances = {}
+        frontier = list(self.core)
+        for cell in frontier:
+            distances[cell] = 0
+        while frontier:
+            nextFrontier = []
+            for cell in frontier:
+                for neighbor in self.neighbors[cell]:
+                    if neighbor not in distances:
+                        distances[neighbor] = distances[cell] + 1
+                        nextFrontier.append(neighbor)
+            frontier = nextFrontier
+        exitDistance = {}
+        for cell in self.cells:
+            if cell not in self.core:
+                exitDistance[cell] = distances.get(cell)
+        return exitDistance
+
+    def _computeDeadEndDepths(self):
+        """
+        Walks every move that leaves a cell towards a non-core cell.  Since
+        non-core cells form trees, the walk from q that avoids p is a tree
+        traversal; it fails as soon as it reaches the core.
+        """
+        depths = {}
+        for p in self.cells:
+            for q in self.neighbors[p]:
+                if q in self.core: continue
+                depth = self._sideDepth(p, q)
+                if depth is not None:
+                    depths[(p, q)] = depth
+        return depths
+
+    def _sideDepth(self, p, q):
+        visited = set([p, q])
+        frontier = [q]
+        depth = 0
+        while frontier:
+            depth += 1
+            nextFrontier = []
+            for cell in frontier:
+                for neighbor in self.neighbors[cell]:
+                    if neighbor in visited: continue
+                    if neighbor in self.core: return None
+                    visited.add(neighbor)
+                    nextFrontier.append(neighbor)
+            frontier = nextFrontier
+        return depth
+
+    def _computeArticulationPoints(self):
+        """
+        Iterative version of Tarjan's low-link algorithm.
+        """
+        discovery = {}
+        low = {}
+        points = set()
+        counter = 0
+        for root in self.cells:
+            if root in discovery: continue
+            discovery[root] = low[root] = counter
+            counter += 1
+            rootChildren = 0
+            stack = [(root, None, iter(self.neighbors[root]))]
+            while stack:
+                cell, parent, children = stack[-1]
+                advanced = False
+                for child in children:
+                    if child == parent: continue
+                    if child in discovery:
+                        low[cell] = min(low[cell], discovery[child])
+                    else:
+                        discovery[child] = low[child] = counter
+                        counter += 1
+                        if cell == root: rootChildren += 1
+                        stack.append((child, cell, iter(self.neighbors[child])))
+                        advanced = True
+                        break
+                if advanced: continue
+                stack.pop()
+                if parent is not None:
+                    low[parent] = min(low[parent], low[cell])
+                    if parent != root and low[cell] >= discovery[parent]:
+                        points.add(parent)
+            if rootChildren > 1:
+                points.add(root)
+        return points
+
+def getTopology(layout):
+    """
+    Returns the (cached) LayoutTopology for a layout.
+    """
+    key = '\n'.join(layout.layoutText)
+    if key not in TOPOLOGY_CACHE:
+        TOPOLOGY_CACHE[key] = LayoutTopology(layout)
+    return TOPOLOGY_CACHE[key]
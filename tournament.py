@@ -0,0 +1,241 @@
+# tournament.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A league of Pacman agents over layouts and ghosts.
+
+Every Pacman plays numGames games of every matchup: each layout, ghost
+type and number of ghosts.  Game i of a league is seeded alike in every
+matchup and every agent draws from its own random stream, so the Pacmen
+face the same dice.  Games are scheduled over a
+process pool longest first, by the average time games on their layout
+(and with their Pacman, when known) have taken so far, and every result is
+written to a SQLite file as it comes in.  Running the same league again
+resumes it: games already in the file are not replayed.
+
+  python tournament.py -p GreedyAgent -p AlphaBetaAgent,depth=2 -g RandomGhost \\
+      -g DirectionalGhost -k 1,2 -n 5 --workers 4 --db league.db
+"""
+
+import glob
+import os
+import random
+import sqlite3
+import sys
+import time
+
+def leagueLayouts(names=None):
+    """
+    The layouts named, or all of layouts/*.lay.
+    """
+    if names: return names
+    paths = glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'layouts', '*.lay'))
+    return sorted([os.path.basename(path)[:-len('.lay')] for path in paths])
+
+def leagueMatchups(pacmen, ghosts, ghostCounts, layoutNames):
+    """
+    Returns the (layout, pacman, ghost, numGhosts) matchups of a league.
+    Ghost counts beyond what a layout holds play as that layout's maximum,
+    once.
+    """
+    import layout
+    matchups = []
+    for layoutName in layoutNames:
+        lay = layout.getLayout(layoutName)
+        if lay == None: raise Exception("The layout " + layoutName + " cannot be found")
+        counts = sorted(set([min(count, lay.getNumGhosts()) for count in ghostCounts]))
+        for pacman in pacmen:
+            for ghost in ghosts:
+                for numGhosts in counts:
+                    matchups.append((layoutName, pacman, ghost, numGhosts))
+    return matchups
+
+###########
+# Results #
+###########
+
+class LeagueStore:
+    """
+    The games of leagues, in the SQLite database at path.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('CREATE TABLE IF NOT EXISTS games ('
+                        'layout TEXT, pacman TEXT, ghost TEXT, numGhosts INTEGER, league TEXT, game INTEGER, '
+                        'score REAL, win INTEGER, numMoves INTEGER, seconds REAL, timeout INTEGER, crashed INTEGER, '
+                        'PRIMARY KEY (layout, pacman, ghost, numGhosts, league, game))')
+        self.db.commit()
+
+    def playedGames(self, league):
+        rows = self.db.execute('SELECT layout, pacman, ghost, numGhosts, game FROM games WHERE league = ?', (league,))
+        return set([tuple(row) for row in rows])
+
+    def store(self, league, matchup, gameIndex, result, seconds):
+        self.db.execute('INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        tuple(matchup) + (league, gameIndex, result.score, int(result.win), result.numMoves,
+                                          seconds, int(result.agentTimeout), int(result.agentCrashed)))
+        self.db.commit()
+
+    def runtimeEstimator(self):
+        """
+        Returns a function from (layout, pacman) to the seconds a game is
+        expected to take: the average so far for that layout and Pacman, or
+        for the layout, or else the layout's size in seconds per cell.
+        """
+        import layout
+        byPair = dict([((row[0], row[1]), row[2]) for row in
+                       self.db.execute('SELECT layout, pacman, AVG(seconds) FROM games GROUP BY layout, pacman')])
+        byLayout = dict([(row[0], row[1]) for row in
+                         self.db.execute('SELECT layout, AVG(seconds) FROM games GROUP BY layout')])
+        sizes = {}
+        def cells(layoutName):
+            if layoutName not in sizes:
+                lay = layout.getLayout(layoutName)
+                sizes[layoutName] = lay.width * lay.height
+            return sizes[layoutName]
+        perCell = 1.0
+        if byLayout:
+            perCell = sum(byLayout.values()) / sum([cells(name) for name in byLayout])
+
+        def estimate(layoutName, pacman):
+            if (layoutName, pacman) in byPair: return byPair[(layoutName, pacman)]
+            if layoutName in byLayout: return byLayout[layoutName]
+            return perCell * cells(layoutName)
+        return estimate
+
+    def standings(self, league):
+        return self.db.execute('SELECT pacman, COUNT(*), AVG(win), AVG(score), SUM(crashed + timeout) FROM games '
+                               'WHERE league = ? GROUP BY pacman ORDER BY AVG(win) DESC, AVG(score) DESC', (league,)).fetchall()
+
+    def close(self):
+        self.db.close()
+
+###########
+# Playing #
+###########
+
+# Layouts and agent types loaded by this process, by name
+_LAYOUTS = {}
+_AGENT_TYPES = {}
+
+def _agentType(name):
+    import pacman
+    if name not in _AGENT_TYPES: _AGENT_TYPES[name] = pacman.loadAgent(name, True)
+    return _AGENT_TYPES[name]
+
+def playMatch(job):
+    """
+    Plays game gameIndex of a matchup and returns the job, its GameResult
+    and the seconds it took.
+    """
+    import layout, pacman, textDisplay
+    (layoutName, pacmanSpec, ghostName, numGhosts), gameIndex, seed, timeout = job
+    if layoutName not in _LAYOUTS: _LAYOUTS[layoutName] = layout.getLayout(layoutName)
+    pacmanName, agentOpts = pacman.parseAgentSpec(pacmanSpec)
+    pacmanAgent = _agentType(pacmanName)(**agentOpts)
+    ghosts = [_agentType(ghostName)(i + 1) for i in range(numGhosts)]
+    rules = pacman.ClassicGameRules(timeout)
+    random.seed(seed)
+    game = rules.newGame(_LAYOUTS[layoutName], pacmanAgent, ghosts, textDisplay.NullGraphics(), True, True)
+    game.randomStreams = seed
+    start = time.time()
+    game.run()
+    return job, pacman.GameResult(game, seed), time.time() - start
+
+def runLeague(store, league, matchups, numGames, workers=1, timeout=30):
+    """
+    Plays the games of matchups that store does not have yet, longest
+    first, storing each result as it comes in.  league names the league's
+    seed, so game i of every matchup gets the same seed.
+    """
+    import multiprocessing, pacman
+    played = store.playedGames(league)
+    estimate = store.runtimeEstimator()
+    jobs = []
+    for matchup in matchups:
+        for gameIndex in range(numGames):
+            if tuple(matchup) + (gameIndex,) in played: continue
+            jobs.append((matchup, gameIndex, pacman.deriveSeed(league, gameIndex), timeout))
+    jobs.sort(key=lambda job: -estimate(job[0][0], job[0][1]))
+    print 'League %s: %d games to play, %d already played' % (league, len(jobs), len(played))
+
+    if workers > 1:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(playMatch, jobs)
+    else:
+        pool = None
+        results = (playMatch(job) for job in jobs)
+    try:
+        for count, (job, result, seconds) in enumerate(results):
+            matchup, gameIndex = job[0], job[1]
+            store.store(league, matchup, gameIndex, result, seconds)
+            print '[%d/%d] %s %s vs %d %s, game %d: %d (%.1fs)' % ((count + 1, len(jobs), matchup[0], matchup[1],
+                                                                   matchup[3], matchup[2], gameIndex, result.score, seconds))
+        if pool != None: pool.close()
+    finally:
+        if pool != None:
+            pool.terminate()
+            pool.join()
+
+def printStandings(store, league):
+    print
+    print '%-32s %6s %8s %10s %8s' % ('Pacman', 'Games', 'Win Rate', 'Avg Score', 'Failures')
+    for pacman, games, winRate, score, failures in store.standings(league):
+        print '%-32s %6d %8.2f %10.1f %8d' % (pacman, games, winRate, score, failures)
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python tournament.py <options>
+    EXAMPLES:   python tournament.py -p GreedyAgent -p ExpectimaxAgent,depth=2 -g RandomGhost -g DirectionalGhost -n 5
+                    - plays both Pacmen against both ghost types on every layout
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-p', '--pacman', dest='pacmen', action='append', default=[],
+                      help='a Pacman to enter, as TYPE or TYPE,opt1=val1,... (repeatable)')
+    parser.add_option('-g', '--ghosts', dest='ghosts', action='append', default=[],
+                      help='a ghost TYPE to play against (repeatable) [Default: RandomGhost]')
+    parser.add_option('-k', '--numghosts', dest='ghostCounts', default='4',
+                      help='comma separated numbers of ghosts [Default: %default]')
+    parser.add_option('-l', '--layout', dest='layouts', action='append', default=[],
+                      help='a layout to play on (repeatable) [Default: all of layouts/]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=5,
+                      help='the number of games of every matchup [Default: %default]')
+    parser.add_option('--workers', dest='workers', type='int', default=1,
+                      help='the number of processes to play in [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='float', default=30,
+                      help='Maximum length of time an agent can spend computing in a single game [Default: %default]')
+    parser.add_option('--seed', dest='seed', default='0',
+                      help='the league seed; a league with a new seed is played afresh [Default: %default]')
+    parser.add_option('--db', dest='db', default='league.db',
+                      help='the SQLite file results are kept in [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    if not options.pacmen: raise Exception('Enter at least one Pacman with -p')
+    if not options.ghosts: options.ghosts = ['RandomGhost']
+    options.ghostCounts = [int(count) for count in options.ghostCounts.split(',')]
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    matchups = leagueMatchups(options.pacmen, options.ghosts, options.ghostCounts, leagueLayouts(options.layouts))
+    store = LeagueStore(options.db)
+    try:
+        runLeague(store, options.seed, matchups, options.numGames, options.workers, options.timeout)
+        printStandings(store, options.seed)
+    finally:
+        store.close()
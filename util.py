@@ -580,18 +580,96 @@ def pause():
 
 # code to handle timeouts
 #
-# FIXME
-# NOTE: TimeoutFuncton is NOT reentrant.  Later timeouts will silently
-# disable earlier timeouts.  Could be solved by maintaining a global list
-# of active time outs.  Currently, questions which have test cases calling
-# this have all student code so wrapped.
+# Timeouts are deadlines with float-second precision.  Each thread keeps a
+# stack of the deadlines it is running under, so timeouts nest: an inner
+# TimeoutFunction cannot outlive an outer one, and leaving it re-arms the
+# outer timer.  On the main thread of a process the deadline preempts the
+# function through an ITIMER_REAL interval timer; other threads cannot
+# receive signals, so there the function must poll checkDeadline, and an
+# overrun is reported when it returns.
 #
 import signal
+import threading
 import time
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+class Deadline:
+    """
+    A point in time a computation has to finish by.
+    """
+    def __init__(self, seconds, outer=None):
+        self.expires = time.time() + seconds
+        if outer != None: self.expires = min(self.expires, outer.expires)
+
+    def remaining(self):
+        return self.expires - time.time()
+
+    def expired(self):
+        return time.time() >= self.expires
+
+_DEADLINES = threading.local()
+
+def _deadlineStack():
+    try:
+        return _DEADLINES.stack
+    except AttributeError:
+        _DEADLINES.stack = []
+        return _DEADLINES.stack
+
+def currentDeadline():
+    """
+    Returns the innermost Deadline of the calling thread, or None.
+    """
+    stack = _deadlineStack()
+    if len(stack) == 0: return None
+    return stack[-1]
+
+def timeRemaining():
+    """
+    Returns the seconds left before the innermost deadline of the calling
+    thread, or None when it is not running under one.
+    """
+    deadline = currentDeadline()
+    if deadline == None: return None
+    return deadline.remaining()
+
+def checkDeadline():
+    """
+    Raises TimeoutFunctionException if the innermost deadline of the calling
+    thread has passed.  Long searches can call this every so often so that
+    they also stop in time off the main thread.
+    """
+    stack = _DEADLINES.__dict__.get('stack')
+    if stack and time.time() >= stack[-1].expires:
+        raise TimeoutFunctionException()
+
+def _alarmHandler(signum, frame):
+    raise TimeoutFunctionException()
+
+def _canPreempt():
+    return hasattr(signal, 'setitimer') and isinstance(threading.current_thread(), threading._MainThread)
+
+def _installAlarmHandler():
+    """
+    Makes _alarmHandler the SIGALRM handler.  In place of the default
+    handler it is installed once and left there, since an alarm would have
+    killed the process anyway; a handler someone else set is returned so
+    that it can be put back.
+    """
+    current = signal.getsignal(signal.SIGALRM)
+    if current is _alarmHandler: return None
+    signal.signal(signal.SIGALRM, _alarmHandler)
+    if current in [signal.SIG_DFL, None]: return None
+    return current
+
+def _setTimer(deadline):
+    if deadline == None:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    else:
+        # A zero interval would disarm the timer instead of firing it
+        signal.setitimer(signal.ITIMER_REAL, max(deadline.remaining(), 1e-6))
 
 class TimeoutFunction:
     def __init__(self, function, timeout):
@@ -602,27 +680,25 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
-            try:
-                result = self.function(*args, **keyArgs)
-            finally:
-                signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
-        else:
-            startTime = time.time()
+        stack = _deadlineStack()
+        deadline = Deadline(self.timeout, currentDeadline())
+        preempt = _canPreempt()
+        old = None
+        if preempt: old = _installAlarmHandler()
+        stack.append(deadline)
+        try:
+            if preempt: _setTimer(deadline)
             result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
-            if timeElapsed >= self.timeout:
-                self.handle_timeout(None, None)
+        finally:
+            stack.pop()
+            if preempt:
+                _setTimer(currentDeadline())
+                if old != None: signal.signal(signal.SIGALRM, old)
+        if not preempt and deadline.expired():
+            self.handle_timeout(None, None)
         return result
 
 
-
 _ORIGINAL_STDOUT = None
 _ORIGINAL_STDERR = None
 _MUTED = False
@@ -631,6 +707,32 @@ class WritableNull:
     def write(self, string):
         pass
 
+class RingBuffer:
+    """
+    A file-like sink that keeps only the last size characters written to
+    it, so capturing the output of a long run takes bounded memory.
+    """
+    def __init__(self, size=65536):
+        self.size = size
+        self.chunks = []
+        self.length = 0
+
+    def write(self, string):
+        self.chunks.append(string)
+        self.length += len(string)
+        if self.length > 2 * self.size:
+            self.chunks = [self.getvalue()]
+            self.length = len(self.chunks[0])
+
+    def writelines(self, lines):
+        for line in lines: self.write(line)
+
+    def flush(self):
+        pass
+
+    def getvalue(self):
+        return ''.join(self.chunks)[-self.size:]
+
 def mutePrint():
     global _ORIGINAL_STDOUT, _ORIGINAL_STDERR, _MUTED
     if _MUTED:
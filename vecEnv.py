@@ -0,0 +1,144 @@
+# vecEnv.py
+# ---------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A vector environment that steps many classic Pacman games in lockstep.
+
+Learning and evaluation code drives Pacman directly: it hands in one action
+per game, the environment moves the ghosts with their ghostAgents policies,
+and it gets back NumPy arrays of observations, rewards and done flags.
+Games that end are started again from the layout's initial state, so every
+slot always holds a game in progress.
+
+  env = PacmanVecEnv(layout.getLayout('smallClassic'), 64)
+  obs = env.reset()
+  obs, rewards, dones, infos = env.step([Directions.WEST] * 64)
+"""
+
+import numpy as np
+
+from game import Directions
+from pacman import ClassicGameRules, GameState
+import ghostAgents
+import random
+import textDisplay
+
+# Action i of an integer action array
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+
+# Observation channels
+WALLS, FOOD, CAPSULES, PACMAN, GHOSTS, SCARED_GHOSTS = range(6)
+NUM_CHANNELS = 6
+
+class PacmanVecEnv:
+    """
+    N independent games on one layout.
+
+    Observations have shape (N, NUM_CHANNELS, width, height) and are indexed
+    like a Grid, so obs[i, FOOD, x, y] is 1 when game i has food at (x, y).
+    Rewards are the change in score over a whole round (Pacman's move and the
+    ghosts' replies).  When a game ends, its done flag is set, its info holds
+    the final score and result, and the observation returned for it is
+    already that of the next game.
+    """
+
+    def __init__(self, layout, numGames, ghostType='RandomGhost', numGhosts=4, seed=None, timeout=30):
+        self.layout = layout
+        self.numGames = numGames
+        self.rules = ClassicGameRules(timeout)
+        self.display = textDisplay.NullGraphics()
+        ghostClass = getattr(ghostAgents, ghostType)
+        self.ghosts = [ghostClass(i + 1) for i in range(min(numGhosts, layout.getNumGhosts()))]
+        if seed is not None: random.seed(seed)
+
+        self.walls = np.array(layout.walls.data, dtype=np.uint8)
+        self.initialState = self.rules.newGame(layout, None, self.ghosts, self.display, quiet=True).state
+        self.states = [None] * numGames
+        self.moves = np.zeros(numGames, dtype=np.int32)
+
+    def _newState(self):
+        return GameState(self.initialState)
+
+    def reset(self):
+        self.states = [self._newState() for i in range(self.numGames)]
+        self.moves[:] = 0
+        return self.observe()
+
+    def observe(self):
+        obs = np.zeros((self.numGames, NUM_CHANNELS, self.layout.width, self.layout.height), dtype=np.uint8)
+        obs[:, WALLS] = self.walls
+        for i, state in enumerate(self.states):
+            self._observeInto(obs[i], state)
+        return obs
+
+    def _observeInto(self, obs, state):
+        obs[FOOD] = state.data.food.data
+        for x, y in state.data.capsules:
+            obs[CAPSULES, x, y] = 1
+        x, y = state.getPacmanPosition()
+        obs[PACMAN, int(x), int(y)] = 1
+        for ghostState in state.getGhostStates():
+            x, y = ghostState.getPosition()
+            channel = GHOSTS
+            if ghostState.scaredTimer > 0: channel = SCARED_GHOSTS
+            obs[channel, int(x + 0.5), int(y + 0.5)] = 1
+
+    def legalActionMask(self):
+        """
+        Returns an (N, len(ACTIONS)) boolean array of Pacman's legal actions.
+        """
+        mask = np.zeros((self.numGames, len(ACTIONS)), dtype=bool)
+        for i, state in enumerate(self.states):
+            for action in state.getLegalActions(0):
+                mask[i, ACTIONS.index(action)] = True
+        return mask
+
+    def step(self, actions):
+        """
+        Plays one round in every game.  actions holds one Directions value or
+        one index into ACTIONS per game; an illegal action is played as STOP
+        and flagged in that game's info.
+        """
+        if len(actions) != self.numGames:
+            raise Exception('Expected %d actions, got %d' % (self.numGames, len(actions)))
+        rewards = np.zeros(self.numGames, dtype=np.float64)
+        dones = np.zeros(self.numGames, dtype=bool)
+        infos = [{} for i in range(self.numGames)]
+
+        for i, state in enumerate(self.states):
+            action = actions[i]
+            if not isinstance(action, str): action = ACTIONS[int(action)]
+            if action not in state.getLegalActions(0):
+                infos[i]['illegal'] = True
+                action = Directions.STOP
+            startScore = state.data.score
+            state = state.generateSuccessor(0, action)
+            for ghost in self.ghosts:
+                if state.isWin() or state.isLose(): break
+                state = state.generateSuccessor(ghost.index, ghost.getAction(state))
+            rewards[i] = state.data.score - startScore
+            self.moves[i] += 1
+
+            if state.isWin() or state.isLose():
+                dones[i] = True
+                infos[i]['score'] = state.data.score
+                infos[i]['win'] = state.isWin()
+                infos[i]['moves'] = int(self.moves[i])
+                state = self._newState()
+                self.moves[i] = 0
+            self.states[i] = state
+
+        # generateSuccessor remembers every state it touches; don't let that grow
+        GameState.getAndResetExplored()
+        return self.observe(), rewards, dones, infos
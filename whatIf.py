@@ -0,0 +1,185 @@
+# whatIf.py
+# ---------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+What-if analysis from the middle of a game.
+
+A game is played up to some move and checkpointed (see Game.checkpoint);
+the rest of it is then played out many times, forked from the checkpoint
+instead of replayed from the first move, with Pacman swapped for each
+agent being compared.  Fork i of every agent is seeded alike, so the
+agents face the same ghost dice.
+
+  python whatIf.py -l smallClassic -p ExpectimaxAgent -a depth=2 --at 60 \\
+      --versus GreedyAgent --versus AlphaBetaAgent,depth=3 -n 20 --workers 4
+
+Forks run in this process, or with --workers in os.fork children, which
+share the parent's memory copy-on-write.
+"""
+
+import copy
+import cPickle
+import os
+import sys
+import traceback
+
+def playToCheckpoint(layout, pacman, ghosts, numMoves, catchExceptions=False):
+    """
+    Plays a game on layout for numMoves moves and returns its checkpoint.
+    """
+    import pacman as pacmanModule, textDisplay
+    rules = pacmanModule.ClassicGameRules()
+    game = rules.newGame(layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions)
+    game.pauseAt = numMoves
+    game.run()
+    if not game.paused:
+        raise Exception('The game ended after %d moves, before move %d' % (len(game.moveHistory), numMoves))
+    return game.checkpoint()
+
+def playFork(checkpoint, agents=None, seed=None):
+    """
+    Plays a fork of checkpoint out and returns its GameResult.
+    """
+    import pacman
+    game = checkpoint.fork(agents, seed=seed)
+    game.run()
+    return pacman.GameResult(game, seed)
+
+def forkInProcess(checkpoint, jobs):
+    """
+    Plays the fork of each (agents, seed) job in turn.
+    """
+    return [playFork(checkpoint, agents, seed) for agents, seed in jobs]
+
+def forkProcesses(checkpoint, jobs, workers):
+    """
+    Plays the fork of each (agents, seed) job in an os.fork child, at most
+    workers at a time, and returns their GameResults in job order.  A
+    child needs no copy of the agents it was given: it has its own.
+    """
+    results = []
+    running = []
+    pending = list(jobs)
+    while pending or running:
+        while pending and len(running) < workers:
+            agents, seed = pending.pop(0)
+            if agents == None: agents = checkpoint.agents
+            read, write = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read)
+                try:
+                    reply = ('ok', playFork(checkpoint, agents, seed))
+                except BaseException:
+                    reply = ('error', traceback.format_exc())
+                f = os.fdopen(write, 'wb')
+                f.write(cPickle.dumps(reply, 2))
+                f.close()
+                os._exit(0)
+            os.close(write)
+            running.append((pid, os.fdopen(read, 'rb')))
+        pid, f = running.pop(0)
+        data = f.read()
+        f.close()
+        os.waitpid(pid, 0)
+        if not data: raise Exception('A fork died without a result')
+        status, value = cPickle.loads(data)
+        if status == 'error': raise Exception('A fork raised:\n' + value)
+        results.append(value)
+    return results
+
+def compareAgents(checkpoint, alternatives, numForks, workers=1, seed=0):
+    """
+    Plays numForks forks of checkpoint for each Pacman in alternatives, a
+    list of (name, makePacman) pairs, and returns the GameResults of each
+    name.  The ghosts are the checkpoint's own.
+    """
+    import pacman
+    checkpoint = copy.copy(checkpoint)
+    checkpoint.rules = copy.copy(checkpoint.rules)
+    checkpoint.rules.quiet = True
+    results = {}
+    for name, makePacman in alternatives:
+        jobs = []
+        for i in range(numForks):
+            ghosts = checkpoint.agents[1:]
+            if workers <= 1: ghosts = copy.deepcopy(ghosts)
+            jobs.append(([makePacman()] + ghosts, pacman.deriveSeed(seed, i)))
+        if workers > 1 and hasattr(os, 'fork'): results[name] = forkProcesses(checkpoint, jobs, workers)
+        else: results[name] = forkInProcess(checkpoint, jobs)
+    return results
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python whatIf.py <options>
+    EXAMPLES:   python whatIf.py -l smallClassic -p ExpectimaxAgent -a depth=2 --at 60 --versus GreedyAgent
+                    - plays to move 60, then compares how ExpectimaxAgent and GreedyAgent finish the game
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='the LAYOUT_FILE from which to load the map layout [Default: %default]', metavar='LAYOUT_FILE')
+    parser.add_option('-p', '--pacman', dest='pacman', default='ReflexAgent',
+                      help='the Pacman TYPE that plays up to the checkpoint [Default: %default]', metavar='TYPE')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default=None,
+                      help='Comma separated values sent to the Pacman agent. e.g. "opt1=val1,opt2,opt3=val3"')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='the ghost agent TYPE in the ghostAgents module to use [Default: %default]', metavar='TYPE')
+    parser.add_option('-k', '--numghosts', type='int', dest='numGhosts', default=4,
+                      help='The maximum number of ghosts to use [Default: %default]')
+    parser.add_option('--at', dest='at', type='int', default=50,
+                      help='the move to checkpoint the game at [Default: %default]')
+    parser.add_option('--versus', dest='versus', action='append', default=[],
+                      help='another Pacman to finish the game with, as TYPE or TYPE,opt1=val1,...')
+    parser.add_option('-n', '--numForks', dest='numForks', type='int', default=10,
+                      help='the number of forks played for every Pacman [Default: %default]')
+    parser.add_option('--workers', dest='workers', type='int', default=1,
+                      help='the number of forked processes to play in [Default: %default]')
+    parser.add_option('--seed', dest='seed', type='int', default=0,
+                      help='the seed of the game up to the checkpoint and of the forks [Default: %default]')
+    options, otherjunk = parser.parse_args(argv)
+    if len(otherjunk) != 0:
+        raise Exception('Command line input not understood: ' + str(otherjunk))
+    return options
+
+def agentMaker(spec, agentArgs=None):
+    """
+    Returns a name and a constructor for the Pacman TYPE,opt1=val1,...
+    """
+    import pacman
+    name = spec
+    if agentArgs == None: spec, agentOpts = pacman.parseAgentSpec(spec)
+    else: agentOpts = pacman.parseAgentArgs(agentArgs)
+    if agentArgs: name += ',' + agentArgs
+    agentType = pacman.loadAgent(spec, True)
+    return name, lambda: agentType(**agentOpts)
+
+if __name__ == '__main__':
+    import layout, pacman, random
+    options = readCommand(sys.argv[1:])
+    lay = layout.getLayout(options.layout)
+    if lay == None: raise Exception("The layout " + options.layout + " cannot be found")
+    alternatives = [agentMaker(options.pacman, options.agentArgs)]
+    alternatives += [agentMaker(spec) for spec in options.versus]
+    ghostType = pacman.loadAgent(options.ghost, True)
+    ghosts = [ghostType(i + 1) for i in range(options.numGhosts)]
+
+    random.seed(options.seed)
+    checkpoint = playToCheckpoint(lay, alternatives[0][1](), ghosts, options.at)
+    print 'Checkpoint at move %d, score %d' % (checkpoint.getNumMoves(), checkpoint.state.getScore())
+    results = compareAgents(checkpoint, alternatives, options.numForks, options.workers, options.seed)
+    for name, makePacman in alternatives:
+        scores = [result.score for result in results[name]]
+        wins = [result.win for result in results[name]]
+        print '%-30s average score %8.1f   wins %d/%d' % (name, sum(scores) / float(len(scores)), wins.count(True), len(wins))